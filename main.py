@@ -9,7 +9,8 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QColor, QFont, QTextCursor, QPalette, QIcon, QPixmap, QBrush, QLinearGradient
 from src.poem_classifier import PoemClassifier
-from src.generate_poem import generate_poem
+from src.generate_poem import get_generator
+from src.poem_pool import PoemPool
 from src.poem_scorer import PoemScorer
 from src.emotion_analyzer import EmotionAnalyzer
 from src.poem_annotator import PoemAnnotator
@@ -40,6 +41,10 @@ class PoemAnalysisSystem(QMainWindow):
         # 初始化评分器
         self.scorer = PoemScorer()
         
+        # 初始化诗词预生成池（后台生成并评分，按钮点击时直接取用）
+        self.poem_pool = PoemPool(get_generator(), self.scorer)
+        self.poem_pool.start()
+        
         # 初始化情感分析器
         self.emotion_analyzer = EmotionAnalyzer()
         
@@ -254,14 +259,9 @@ class PoemAnalysisSystem(QMainWindow):
             # 添加标题
             self.result_text.append('<h2 style="color: #8B4513; text-align: center;">生成的诗词及评分</h2>')
             
-            # 生成5首诗词并评分
-            for i in range(5):
+            # 从预生成池中取出5首已评分的诗词
+            for i, (poem, result) in enumerate(self.poem_pool.get(5)):
                 try:
-                    # 生成诗词
-                    poem = generate_poem()
-                    # 评分
-                    result = self.scorer.score_poem(poem)
-                    
                     # 构建显示文本
                     display_text = f'<div style="margin: 15px; padding: 15px; background-color: #FFF8DC; border-radius: 10px;">'
                     display_text += f'<h3 style="color: #8B4513;">第{i+1}首：</h3>'
@@ -282,7 +282,7 @@ class PoemAnalysisSystem(QMainWindow):
                     # 显示结果
                     self.result_text.append(display_text)
                 except Exception as e:
-                    self.result_text.append(f'<div style="color: #B22222;">第{i+1}首生成失败：{str(e)}</div>')
+                    self.result_text.append(f'<div style="color: #B22222;">第{i+1}首显示失败：{str(e)}</div>')
                     continue
             
         except Exception as e:
@@ -299,11 +299,11 @@ class PoemAnalysisSystem(QMainWindow):
             # 随机选择5首诗进行情感分析
             selected_poems = random.sample(self.example_poems, 5)
             
-            for i, (poem, _) in enumerate(selected_poems, 1):
+            # 一次批量完成情感分析
+            results = self.emotion_analyzer.analyze_emotions([poem for poem, _ in selected_poems])
+            
+            for i, ((poem, _), result) in enumerate(zip(selected_poems, results), 1):
                 try:
-                    # 进行情感分析
-                    result = self.emotion_analyzer.analyze_emotion(poem)
-                    
                     # 构建显示文本
                     display_text = f'<div style="margin: 15px; padding: 15px; background-color: #FFF8DC; border-radius: 10px;">'
                     display_text += f'<h3 style="color: #8B4513;">第{i}首：</h3>'
@@ -346,16 +346,23 @@ class PoemAnalysisSystem(QMainWindow):
         self.result_text.clear()
         self.result_text.append('<h2 style="color: #8B4513; text-align: center;">诗词关键词高亮与注释</h2>')
         
-        # 生成5首诗词
-        for i in range(5):
+        # 从预生成池中取出5首诗词
+        try:
+            poems = [poem for poem, _ in self.poem_pool.get(5)]
+        except Exception as e:
+            self.result_text.append(f'<div style="color: #B22222;">诗词生成失败：{str(e)}</div>')
+            return
+        
+        # 一次批量得到全部诗词的实体区间
+        all_spans = list(self.annotator.annotate_many(poems))
+        
+        for i, (poem, spans) in enumerate(zip(poems, all_spans)):
             try:
-                # 生成诗词
-                poem = generate_poem()
                 if not poem:
                     continue
                     
-                # 高亮关键词并获取注释
-                highlighted_poem, annotations = self.annotator.highlight_and_annotate(poem)
+                # 按实体区间高亮关键词并获取注释
+                highlighted_poem, annotations = self.annotator.render_html(poem, spans)
                 
                 # 构建显示文本
                 display_text = f'<div style="margin: 15px; padding: 15px; background-color: #FFF8DC; border-radius: 10px;">'
@@ -401,6 +408,14 @@ class PoemAnalysisSystem(QMainWindow):
             logging.error(f"翻译诗词时出错：{str(e)}")
             self.result_text.setPlainText(f"翻译诗词时出错：{str(e)}")
 
+    def closeEvent(self, event):
+        # 停止预生成池的后台线程
+        self.poem_pool.stop()
+        # 归还共享的BERT模型
+        self.scorer.close()
+        self.emotion_analyzer.close()
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
         bg_path = "resources/bamboo_bg.jpg"
         if os.path.exists(bg_path):
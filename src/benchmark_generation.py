@@ -0,0 +1,192 @@
+"""
+诗词生成性能测试
+
+测试内容：
+1. 批量吞吐量：不同批大小（1~64）下每秒生成的诗词数量，用于选择夜间批量生成任务的批大小
+2. 投机解码：n-gram 草稿字的接受率，以及相对普通逐字采样的单首延迟加速比
+3. int8 量化：fp32 与 int8 模型的加载时间、单首延迟、常驻内存增量和评分分布（质量参考）
+   常驻内存增量在同一进程内先后测量会互相影响，需要精确数字时用 --variants 分别单独运行；
+   另测量量化模型冷启动（量化并写缓存）与热启动（从缓存载入）的耗时
+
+使用方法：
+    python src/benchmark_generation.py --batch-sizes 1 2 4 8 16 32 64 --repeats 3
+    python src/benchmark_generation.py --benchmarks speculative --poems 20 --draft-length 4
+    python src/benchmark_generation.py --benchmarks quantization --variants int8
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加当前目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from generate_poem import MODEL_NAME, PoemGenerator, get_generator
+from features.quantization import load_quantized_model
+from poem_scorer import PoemScorer
+
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+
+def benchmark_throughput(generator, batch_sizes, repeats=3):
+    """
+    测试不同批大小下的生成吞吐量
+    :param generator: 生成会话
+    :param batch_sizes: 批大小列表
+    :param repeats: 每个批大小重复次数
+    :return: [{'batch_size', 'seconds_per_batch', 'poems_per_sec'}, ...]
+    """
+    # 预热：排除首次调用的内存分配开销
+    generator.generate_poems(1)
+
+    results = []
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            generator.generate_poems(batch_size)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'batch_size': batch_size,
+            'seconds_per_batch': elapsed / repeats,
+            'poems_per_sec': batch_size * repeats / elapsed
+        })
+    return results
+
+def benchmark_speculative(generator, n_poems=20, draft_length=4, form='五言绝句'):
+    """
+    对比普通采样和投机解码的单首生成延迟
+    :return: {'plain_seconds', 'speculative_seconds', 'speedup', 'acceptance_rate', 'tokens_per_forward'}
+    """
+    # 预热：构建草稿模型并排除首次调用开销
+    generator.generate_speculative(form=form, draft_length=draft_length)
+    generator.generate(form=form)
+
+    start = time.perf_counter()
+    for _ in range(n_poems):
+        generator.generate(form=form)
+    plain = (time.perf_counter() - start) / n_poems
+
+    stats = {}
+    start = time.perf_counter()
+    for _ in range(n_poems):
+        generator.generate_speculative(form=form, draft_length=draft_length, stats=stats)
+    speculative = (time.perf_counter() - start) / n_poems
+
+    return {
+        'plain_seconds': plain,
+        'speculative_seconds': speculative,
+        'speedup': plain / speculative,
+        'acceptance_rate': stats['accepted'] / stats['proposed'] if stats['proposed'] else 0.0,
+        'tokens_per_forward': stats['tokens'] / max(stats['forward_passes'], 1)
+    }
+
+def current_rss_mb():
+    """当前进程常驻内存（MB），不支持的平台返回 nan"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+def benchmark_quantization(scorer, variants=('fp32', 'int8'), n_poems=20, form='五言绝句'):
+    """
+    对比 fp32 与 int8 量化模型
+    :param scorer: 评分器，用评分分布作为生成质量的参考
+    :return: [{'variant', 'load_seconds', 'rss_mb', 'seconds_per_poem', 'score_mean', 'score_std'}, ...]
+    """
+    results = []
+    for variant in variants:
+        gc.collect()
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        generator = PoemGenerator(quantize=(variant == 'int8'))
+        load_seconds = time.perf_counter() - start
+        rss_mb = current_rss_mb() - rss_before
+
+        generator.generate(form=form)
+        start = time.perf_counter()
+        poems = [generator.generate(form=form) for _ in range(n_poems)]
+        seconds_per_poem = (time.perf_counter() - start) / n_poems
+
+        scores = [result['total_score'] for result in (scorer.score_poem(poem) for poem in poems)]
+        results.append({
+            'variant': variant,
+            'load_seconds': load_seconds,
+            'rss_mb': rss_mb,
+            'seconds_per_poem': seconds_per_poem,
+            'score_mean': statistics.mean(scores),
+            'score_std': statistics.pstdev(scores)
+        })
+        del generator
+    return results
+
+def benchmark_quantized_load(model_name=MODEL_NAME):
+    """
+    量化模型冷启动与热启动耗时，使用临时缓存文件，不影响正式缓存
+    :return: {'cold_seconds', 'warm_seconds'}
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'quantized.pt')
+        start = time.perf_counter()
+        load_quantized_model(model_name, cache_path)
+        cold = time.perf_counter() - start
+        gc.collect()
+        start = time.perf_counter()
+        load_quantized_model(model_name, cache_path)
+        warm = time.perf_counter() - start
+    return {'cold_seconds': cold, 'warm_seconds': warm}
+
+def main():
+    parser = argparse.ArgumentParser(description='诗词生成性能测试')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES,
+                        help='要测试的批大小')
+    parser.add_argument('--repeats', type=int, default=3, help='每个批大小的重复次数')
+    parser.add_argument('--benchmarks', nargs='+', choices=['throughput', 'speculative', 'quantization'],
+                        default=['throughput', 'speculative', 'quantization'], help='要运行的测试')
+    parser.add_argument('--variants', nargs='+', choices=['fp32', 'int8'], default=['fp32', 'int8'],
+                        help='量化测试要对比的模型')
+    parser.add_argument('--poems', type=int, default=20, help='投机解码/量化测试生成的诗词数量')
+    parser.add_argument('--draft-length', type=int, default=4, help='投机解码每轮草稿字数')
+    args = parser.parse_args()
+
+    if 'quantization' in args.benchmarks:
+        # 量化测试自行加载模型，放在共享会话加载之前以免影响内存测量
+        print("\nint8 量化对比：")
+        print(f"{'模型':>6} {'加载(s)':>8} {'内存(MB)':>9} {'s/首':>7} {'平均分':>7} {'标准差':>7}")
+        for row in benchmark_quantization(PoemScorer(), args.variants, args.poems):
+            print(f"{row['variant']:>6} {row['load_seconds']:>8.2f} {row['rss_mb']:>9.1f} "
+                  f"{row['seconds_per_poem']:>7.3f} {row['score_mean']:>7.2f} {row['score_std']:>7.2f}")
+        if 'int8' in args.variants:
+            load = benchmark_quantized_load()
+            print(f"int8 冷启动（量化+写缓存）：{load['cold_seconds']:.2f}s，热启动（读缓存）：{load['warm_seconds']:.2f}s")
+        if args.benchmarks == ['quantization']:
+            return
+
+    generator = get_generator()
+    print(f"设备：{generator.device}")
+
+    if 'throughput' in args.benchmarks:
+        print("\n批量吞吐量：")
+        print(f"{'批大小':>6} {'每批耗时(s)':>12} {'诗词/秒':>10}")
+        for row in benchmark_throughput(generator, args.batch_sizes, args.repeats):
+            print(f"{row['batch_size']:>6} {row['seconds_per_batch']:>12.3f} {row['poems_per_sec']:>10.2f}")
+
+    if 'speculative' in args.benchmarks:
+        result = benchmark_speculative(generator, args.poems, args.draft_length)
+        print("\n投机解码：")
+        print(f"普通采样：{result['plain_seconds']:.3f} s/首")
+        print(f"投机解码：{result['speculative_seconds']:.3f} s/首")
+        print(f"加速比：{result['speedup']:.2f}x")
+        print(f"草稿接受率：{result['acceptance_rate']:.1%}")
+        print(f"每次前向产出token数：{result['tokens_per_forward']:.2f}")
+
+if __name__ == '__main__':
+    main()
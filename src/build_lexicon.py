@@ -0,0 +1,54 @@
+"""
+注释词库编译工具
+
+把 TSV 词库（每行 "词\t类型\t注释"）编译为 PoemAnnotator 可 mmap 加载的二进制词库，
+类型为 典故/人物/地名/意象/物象，同一个词出现多次时按 典故 > 人物 > 地名 > 意象 > 物象 保留一种类型
+
+使用方法：
+    python src/build_lexicon.py --export-builtin lexicon.tsv
+    python src/build_lexicon.py lexicon.tsv models/annotation_lexicon.bin
+然后在 AnnotatorConfig.lexicon_path 中指定输出文件
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加当前目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from features.compiled_lexicon import build_lexicon, read_tsv
+from poem_annotator import ANNOTATION_DICT, ENTITY_WORDS
+
+def export_builtin(path):
+    """把 poem_annotator.py 内置的五类词典导出为 TSV，作为扩充词库的起点"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for etype, words in ENTITY_WORDS.items():
+            for word in sorted(words):
+                f.write(f"{word}\t{etype}\t{ANNOTATION_DICT.get(word, '')}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description='注释词库编译工具')
+    parser.add_argument('tsv', nargs='?', help='TSV 词库路径')
+    parser.add_argument('output', nargs='?', default='models/annotation_lexicon.bin', help='输出的二进制词库路径')
+    parser.add_argument('--export-builtin', metavar='TSV', help='导出内置词典为 TSV 后退出')
+    args = parser.parse_args()
+
+    if args.export_builtin:
+        export_builtin(args.export_builtin)
+        print(f"内置词典已导出：{args.export_builtin}")
+        return
+    if not args.tsv:
+        parser.error('需要指定 TSV 词库路径')
+
+    start = time.perf_counter()
+    entries = read_tsv(args.tsv)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    count = build_lexicon(entries, args.output, list(ENTITY_WORDS))
+    print(f"读取{len(entries)}行，写入{count}个词条：{args.output}（{time.perf_counter() - start:.2f}s）")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""
+注释器配置
+"""
+
+class AnnotatorConfig:
+    # 编译后的二进制词库（由 src/build_lexicon.py 生成），为 None 时使用 poem_annotator.py 内置词典
+    lexicon_path = None
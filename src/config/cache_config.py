@@ -0,0 +1,14 @@
+"""
+缓存配置
+"""
+
+class CacheConfig:
+    # BERT 嵌入缓存
+    embedding_cache_size = 10000  # 内存中最多缓存的嵌入条数
+    embedding_persist_dir = None  # 磁盘持久化目录（如 "cache/embeddings"），为 None 时不持久化
+
+    # 模型注册表
+    model_idle_timeout = None  # 引用计数归零后多少秒卸载模型：None 表示常驻，0 表示立即卸载
+
+    # 分词缓存
+    segmentation_cache_size = 20000  # 最多缓存的分词结果条数
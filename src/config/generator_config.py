@@ -19,4 +19,8 @@ class GeneratorConfig:
     random_seed = 42
     
     # 设备配置
-    device = "cuda"  # 如果没有GPU，会自动切换到CPU 
\ No newline at end of file
+    device = "cuda"  # 如果没有GPU，会自动切换到CPU
+    
+    # 推理配置
+    quantize = False  # CPU 上使用 int8 动态量化推理
+    quantized_model_path = "models/gpt2-chinese-poem-int8.pt"  # 量化模型缓存
@@ -45,4 +45,15 @@ class PoemConfig:
     WUYAN_JUJUE_PATTERNS = [
         "仄仄平平仄，平平仄仄平。平平平仄仄，仄仄仄平平。",
         "平平仄仄平，仄仄仄平平。仄仄平平仄，平平仄仄平。"
-    ] 
\ No newline at end of file
+    ]
+    
+    # 诗体格式：每句字数、句数
+    POEM_FORMS = {
+        "五言绝句": {"chars_per_line": 5, "lines": 4},
+        "七言绝句": {"chars_per_line": 7, "lines": 4},
+        "五言律诗": {"chars_per_line": 5, "lines": 8},
+        "七言律诗": {"chars_per_line": 7, "lines": 8}
+    }
+    
+    # 句末标点：单句用逗号，双句用句号
+    LINE_PUNCTUATION = ["，", "。"]
@@ -0,0 +1,21 @@
+"""
+诗词预生成池配置
+"""
+
+class PoolConfig:
+    # 池容量
+    pool_size = 20
+    # 池中诗词少于该数量时后台开始补充
+    low_water_mark = 5
+    # 每次补充时一个批次生成的数量
+    refill_batch_size = 10
+    # 入池的最低总分
+    score_threshold = 50
+    # 一批中没有达到最低总分的诗词时，仍保留得分最高的几首入池，保证补充总能结束
+    fallback_top_k = 2
+    # 连续出现无达标诗词的批次时，下一批开始前的等待秒数（逐次翻倍，不超过上限）
+    empty_refill_backoff = 1.0
+    max_refill_backoff = 60.0
+    
+    # 生成参数
+    form = "五言绝句"
@@ -0,0 +1,9 @@
+"""
+分词配置
+"""
+
+class SegmenterConfig:
+    # 默认分词后端：hanlp / jieba / maxmatch
+    backend = "hanlp"
+    # 词典最大匹配分词的最大词长
+    max_word_length = 8
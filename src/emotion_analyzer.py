@@ -53,20 +53,66 @@
    - HanLP：分词和词性标注
    - BERT：语义理解和向量生成
    - jieba：辅助分词
+
+5. 嵌入缓存：
+   - BERT 嵌入与评分器共用进程内的 EmbeddingCache（utils/embedding_cache.py）
+   - 同一模型下相同文本只编码一次，可选持久化到磁盘
+
+6. 共享模型：
+   - BertTokenizer/BertModel 从进程内的 ModelRegistry（utils/model_registry.py）获取
+   - 与评分器共用同一份权重，close() 归还引用
+
+7. 情感类别嵌入矩阵：
+   - 六个情感类别的文本（关键词+意象词）只编码一次，按行归一化成 6×H 矩阵
+   - 词库版本号在重新赋值 emotion_categories 或调用 invalidate_lexicon() 时加一，只有版本变化时才重新计算
+   - 就地修改词库（如向某类的 imagery 列表追加词）后需调用 invalidate_lexicon()
+   - 每首诗的语义评分变为一次 BERT 前向加一次矩阵-向量乘法
+
+8. 批量情感分析：
+   - analyze_emotions(poems, batch_size) 按批做一次 BERT 前向，
+     整批诗词嵌入归一化后与类别矩阵做一次矩阵乘法得到全部相似度
+   - 意象词整批提取，不逐首输出日志；返回结果与 analyze_emotion 的字典格式相同
+
+9. 意象词倒排索引：
+   - 词库编译为 意象词 -> [情感, ...] 的哈希索引（如"明月"同属思乡、清静），与类别矩阵一样按词库版本缓存
+   - 提取意象词时每个词只查一次索引，耗时与诗词长度成正比，不随词库规模增长
+
+10. 逐句情感轨迹：
+   - analyze_emotion_by_line 把全部诗句放进一个批次编码，与情感类别矩阵一次相乘
+   - 返回 句数×6 的相似度数组，列顺序同 emotion_categories，用于检测绝句第三句的"转"
+   - 没有标点和换行的整首诗按五言/七言的字数均分成句
+
+11. 分词后端：
+   - 通过 utils/segmenter.py 的统一接口分词，后端（hanlp/jieba/maxmatch）可配置，默认 HanLP
+   - HanLP 在第一次分词时才启动 JVM，不注册意象词，分词结果与原先一致
+     （其自定义词典是 JVM 全局的，注册后"孤舟""归雁"等会在所有调用方变成一个词）
+   - jieba/maxmatch 在词库赋值或 invalidate_lexicon() 时把意象词注册到独立的 "emotion" 词典，
+     第一首诗分词前就已生效，不影响评分器
 """
 
-import torch
 from transformers import BertTokenizer, BertModel
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import jieba
 import logging
+import re
 from collections import Counter
-from pyhanlp import *
 import os
+import sys
+
+# 添加当前目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from utils.embedding_cache import embed_texts, get_embedding_cache
+from utils.model_registry import get_model_registry
+from utils.segmenter import get_segmenter
 
 class EmotionAnalyzer:
-    def __init__(self):
+    def __init__(self, segmenter_backend=None):
+        """
+        :param segmenter_backend: 分词后端 hanlp/jieba/maxmatch，为 None 时使用 SegmenterConfig.backend
+        """
         try:
             logging.info("开始初始化情感分析器...")
             
@@ -76,12 +122,18 @@ class EmotionAnalyzer:
             if not os.path.exists(model_path):
                 raise FileNotFoundError(f"模型路径不存在：{model_path}")
             
-            self.tokenizer = BertTokenizer.from_pretrained(model_path)
-            self.model = BertModel.from_pretrained(model_path)
-            self.model.eval()
+            self.model_path = model_path
+            self.model_registry = get_model_registry()
+            self.tokenizer = self.model_registry.acquire(BertTokenizer, model_path)
+            self.model = self.model_registry.acquire(BertModel, model_path)
+            self.embedding_cache = get_embedding_cache()
             logging.info("BERT模型和tokenizer加载完成")
             
-            # 重构情感类别
+            # 分词器（HanLP 在第一次分词时才启动）；意象词加入独立的 "emotion" 用户词典，不影响评分器的分词
+            self.segmenter = get_segmenter(segmenter_backend, dictionary='emotion')
+            
+            # 重构情感类别（赋值时词库版本号加一，意象词注册为用户词）
+            self.lexicon_version = 0
             self.emotion_categories = {
                 '思乡': {
                     'keywords': ['乡', '家', '归', '故', '亲', '念', '忆', '怀', '望', '思'],
@@ -110,6 +162,14 @@ class EmotionAnalyzer:
             }
             logging.info("情感类别初始化完成")
             
+            # 情感类别嵌入矩阵，首次使用时计算
+            self._emotion_matrix = None
+            self._emotion_matrix_version = None
+            
+            # 意象词倒排索引，首次使用时构建
+            self._imagery_index = None
+            self._imagery_index_version = None
+            
             # 配置日志
             logging.basicConfig(
                 level=logging.INFO,
@@ -125,39 +185,98 @@ class EmotionAnalyzer:
             logging.error(f"情感分析器初始化失败：{str(e)}")
             raise
 
+    def close(self):
+        """归还共享的BERT模型和tokenizer"""
+        self.model_registry.release(BertTokenizer, self.model_path)
+        self.model_registry.release(BertModel, self.model_path)
+
     def get_bert_embedding(self, text):
-        """获取文本的BERT嵌入"""
+        """获取文本的BERT嵌入（优先从嵌入缓存读取）"""
         try:
-            logging.info(f"正在获取文本的BERT嵌入：{text[:20]}...")
-            inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            return outputs.last_hidden_state.mean(dim=1).numpy()
+            return self.get_bert_embeddings([text])
         except Exception as e:
             logging.error(f"获取BERT嵌入失败：{str(e)}")
             raise
 
+    def get_bert_embeddings(self, texts, batch_size=32):
+        """批量获取文本的BERT嵌入（经共享嵌入缓存，见 utils/embedding_cache.py 的 embed_texts）"""
+        return embed_texts(self.tokenizer, self.model, self.model_path, texts, batch_size, self.embedding_cache)
+
+    @property
+    def emotion_categories(self):
+        """情感词库：{情感: {'keywords': [...], 'imagery': [...]}}"""
+        return self._emotion_categories
+
+    @emotion_categories.setter
+    def emotion_categories(self, categories):
+        self._emotion_categories = categories
+        self.invalidate_lexicon()
+
+    def invalidate_lexicon(self):
+        """词库改变后调用：版本号加一，意象词立即注册为用户词（仅 jieba/maxmatch），类别嵌入矩阵和意象词索引在下次使用时重建"""
+        self.lexicon_version += 1
+        self.segmenter.add_words([word for data in self.emotion_categories.values() for word in data['imagery']])
+
+    @property
+    def emotion_matrix(self):
+        """
+        按行归一化的情感类别嵌入矩阵（类别数×隐层维度），行顺序与 emotion_categories 一致
+        词库版本变化后重新计算
+        """
+        version = self.lexicon_version
+        if self._emotion_matrix is None or self._emotion_matrix_version != version:
+            logging.info("正在计算情感类别嵌入矩阵...")
+            texts = [' '.join(data['keywords'] + data['imagery']) for data in self.emotion_categories.values()]
+            matrix = self.get_bert_embeddings(texts)
+            self._emotion_matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._emotion_matrix_version = version
+        return self._emotion_matrix
+
+    @property
+    def imagery_index(self):
+        """
+        意象词倒排索引：{意象词: [情感, ...]}，情感按 emotion_categories 的顺序排列
+        词库版本变化后重建
+        """
+        version = self.lexicon_version
+        if self._imagery_index is None or self._imagery_index_version != version:
+            index = {}
+            for emotion, data in self.emotion_categories.items():
+                for word in data['imagery']:
+                    emotions = index.setdefault(word, [])
+                    if emotion not in emotions:
+                        emotions.append(emotion)
+            self._imagery_index = index
+            self._imagery_index_version = version
+        return self._imagery_index
+
+    def semantic_scores(self, embedding):
+        """诗词嵌入与各情感类别的余弦相似度：{情感: 相似度}"""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        similarities = self.emotion_matrix @ (vector / np.linalg.norm(vector))
+        return {emotion: float(similarity)
+                for emotion, similarity in zip(self.emotion_categories.keys(), similarities)}
+
     def extract_imagery_and_emotions(self, poem):
-        """使用HanLP提取意象词并标注情感"""
+        """分词后提取意象词并标注情感"""
         try:
             logging.info(f"正在提取意象词：{poem[:20]}...")
-            # 使用HanLP进行词性标注
-            words = HanLP.segment(poem)
-            imagery_emotions = []
-            
-            for word in words:
-                word_text = str(word.word)
-                # 检查是否是意象词
-                for emotion, data in self.emotion_categories.items():
-                    if word_text in data['imagery']:
-                        imagery_emotions.append((word_text, emotion))
-            
+            imagery_emotions = self.match_imagery(self.segmenter.segment(poem))
             logging.info(f"提取到{len(imagery_emotions)}个意象词")
             return imagery_emotions
         except Exception as e:
             logging.error(f"提取意象词失败：{str(e)}")
             raise
 
+    def match_imagery(self, words):
+        """在分词结果中查找意象词：[(意象词, 情感), ...]，同属多个情感的意象词每个情感各记一次"""
+        index = self.imagery_index
+        imagery_emotions = []
+        for word in words:
+            for emotion in index.get(word, ()):
+                imagery_emotions.append((word, emotion))
+        return imagery_emotions
+
     def analyze_emotion(self, poem):
         """分析诗词情感"""
         try:
@@ -166,56 +285,121 @@ class EmotionAnalyzer:
             # 1. 提取意象词及其情感
             imagery_emotions = self.extract_imagery_and_emotions(poem)
             
-            # 2. 基于意象词的情感分析
-            emotion_scores = {emotion: 0 for emotion in self.emotion_categories.keys()}
-            for _, emotion in imagery_emotions:
-                emotion_scores[emotion] += 1
+            # 2. 基于BERT的语义分析（与预先计算的情感类别嵌入矩阵做一次矩阵-向量乘法）
+            emotion_embeddings = self.semantic_scores(self.get_bert_embedding(poem))
             
-            # 3. 基于BERT的语义分析
-            poem_embedding = self.get_bert_embedding(poem)
-            emotion_embeddings = {}
-            for emotion, data in self.emotion_categories.items():
-                # 将情感关键词和意象词组合成文本
-                emotion_text = ' '.join(data['keywords'] + data['imagery'])
-                emotion_embedding = self.get_bert_embedding(emotion_text)
-                # 计算相似度
-                similarity = cosine_similarity(poem_embedding, emotion_embedding)[0][0]
-                emotion_embeddings[emotion] = similarity
-
-            # 4. 综合两种方法的结果
-            final_scores = {}
-            for emotion in self.emotion_categories.keys():
-                # 意象词得分和语义相似度的加权平均
-                imagery_score = emotion_scores[emotion] / len(imagery_emotions) if imagery_emotions else 0
-                semantic_score = emotion_embeddings[emotion]
-                final_scores[emotion] = 0.6 * imagery_score + 0.4 * semantic_score
-
-            # 5. 获取主要情感和辅助情感
-            sorted_emotions = sorted(final_scores.items(), key=lambda x: x[1], reverse=True)
-            main_emotion = sorted_emotions[0][0]
-            secondary_emotion = sorted_emotions[1][0] if len(sorted_emotions) > 1 else None
-
-            # 6. 生成分析报告
-            analysis = self.generate_analysis(main_emotion, secondary_emotion, imagery_emotions, final_scores)
+            # 3. 综合两种方法的结果
+            result = self.combine_scores(imagery_emotions, emotion_embeddings)
             
-            logging.info(f"情感分析完成，主要情感：{main_emotion}")
-
-            return {
-                'main_emotion': main_emotion,
-                'secondary_emotion': secondary_emotion,
-                'imagery_emotions': imagery_emotions,
-                'emotion_scores': final_scores,
-                'analysis': analysis
-            }
+            logging.info(f"情感分析完成，主要情感：{result['main_emotion']}")
+            return result
         except Exception as e:
             logging.error(f"情感分析失败：{str(e)}")
-            return {
-                'main_emotion': '未知',
-                'secondary_emotion': None,
-                'imagery_emotions': [],
-                'emotion_scores': {},
-                'analysis': f"分析失败：{str(e)}"
-            }
+            return self.failed_result(e)
+
+    def analyze_emotions(self, poems, batch_size=32):
+        """
+        批量分析诗词情感
+        :param poems: 诗词列表
+        :param batch_size: 每批BERT前向的诗词数量
+        :return: 与 poems 对应的结果列表，每项格式同 analyze_emotion
+        """
+        results = []
+        logging.info(f"开始批量情感分析：共{len(poems)}首")
+        for start in range(0, len(poems), batch_size):
+            batch = poems[start:start + batch_size]
+            try:
+                # 整批提取意象词
+                imagery = [self.match_imagery(self.segmenter.segment(poem)) for poem in batch]
+                
+                # 整批BERT前向，归一化后与情感类别矩阵一次相乘
+                embeddings = self.get_bert_embeddings(batch, batch_size)
+                normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+                similarities = normed @ self.emotion_matrix.T
+                
+                emotions = list(self.emotion_categories.keys())
+                for imagery_emotions, row in zip(imagery, similarities):
+                    semantic = {emotion: float(value) for emotion, value in zip(emotions, row)}
+                    results.append(self.combine_scores(imagery_emotions, semantic))
+            except Exception as e:
+                logging.error(f"批量情感分析失败（第{start + 1}~{start + len(batch)}首）：{str(e)}")
+                results.extend(self.failed_result(e) for _ in batch)
+        logging.info(f"批量情感分析完成：共{len(results)}首")
+        return results
+
+    def combine_scores(self, imagery_emotions, emotion_embeddings):
+        """
+        综合意象词得分和语义相似度，生成单首诗的分析结果
+        :param imagery_emotions: [(意象词, 情感), ...]
+        :param emotion_embeddings: {情感: 语义相似度}
+        """
+        # 基于意象词的情感分析
+        emotion_scores = {emotion: 0 for emotion in self.emotion_categories.keys()}
+        for _, emotion in imagery_emotions:
+            emotion_scores[emotion] += 1
+        
+        final_scores = {}
+        for emotion in self.emotion_categories.keys():
+            # 意象词得分和语义相似度的加权平均
+            imagery_score = emotion_scores[emotion] / len(imagery_emotions) if imagery_emotions else 0
+            semantic_score = emotion_embeddings[emotion]
+            final_scores[emotion] = 0.6 * imagery_score + 0.4 * semantic_score
+
+        # 获取主要情感和辅助情感
+        sorted_emotions = sorted(final_scores.items(), key=lambda x: x[1], reverse=True)
+        main_emotion = sorted_emotions[0][0]
+        secondary_emotion = sorted_emotions[1][0] if len(sorted_emotions) > 1 else None
+
+        # 生成分析报告
+        analysis = self.generate_analysis(main_emotion, secondary_emotion, imagery_emotions, final_scores)
+
+        return {
+            'main_emotion': main_emotion,
+            'secondary_emotion': secondary_emotion,
+            'imagery_emotions': imagery_emotions,
+            'emotion_scores': final_scores,
+            'analysis': analysis
+        }
+
+    def failed_result(self, error):
+        """分析失败时返回的结果"""
+        return {
+            'main_emotion': '未知',
+            'secondary_emotion': None,
+            'imagery_emotions': [],
+            'emotion_scores': {},
+            'analysis': f"分析失败：{str(error)}"
+        }
+
+    def split_lines(self, poem):
+        """
+        把诗词切分为诗句：按换行和标点切分；
+        整首诗没有标点时，按五言/七言绝句、律诗的字数均分
+        """
+        lines = [line.strip() for line in re.split(r'[\n，。！？；,.!?;]', poem) if line.strip()]
+        if len(lines) == 1:
+            text = lines[0]
+            for chars_per_line in (7, 5):
+                if len(text) % chars_per_line == 0 and len(text) // chars_per_line in (4, 8):
+                    return [text[i:i + chars_per_line] for i in range(0, len(text), chars_per_line)]
+        return lines
+
+    def analyze_emotion_by_line(self, poem):
+        """
+        逐句情感分析：全部诗句一次批量编码，与情感类别矩阵一次相乘
+        :param poem: 诗词
+        :return: 句数×情感类别数 的余弦相似度数组，列顺序同 emotion_categories
+        """
+        try:
+            lines = self.split_lines(poem)
+            if not lines:
+                return np.zeros((0, len(self.emotion_categories)), dtype=np.float32)
+            embeddings = self.get_bert_embeddings(lines)
+            normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+            return normed @ self.emotion_matrix.T
+        except Exception as e:
+            logging.error(f"逐句情感分析失败：{str(e)}")
+            raise
 
     def generate_analysis(self, main_emotion, secondary_emotion, imagery_emotions, scores):
         """生成分析报告"""
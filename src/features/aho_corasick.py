@@ -0,0 +1,87 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机：一次扫描原文找出全部词典词，
+    耗时与 文本长度 + 匹配数 成正比，与词典大小无关
+    """
+
+    def __init__(self):
+        self.goto = [{}]       # 每个状态的转移表：字 -> 状态
+        self.fail = [0]        # 失配指针
+        self.output = [None]   # 以该状态结尾的词：(词长, 值)，不是词尾时为 None
+        self.dict_link = [-1]  # 沿失配指针最近的词尾状态
+        self._built = False
+
+    def add(self, word, value):
+        """添加词典词，同一个词重复添加时以后添加的值为准"""
+        state = 0
+        for char in word:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.dict_link.append(-1)
+            state = next_state
+        self.output[state] = (len(word), value)
+        self._built = False
+
+    def build(self):
+        """按广度优先计算失配指针和词尾链接"""
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+            self.dict_link[state] = -1
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                failed = self.fail[next_state]
+                self.dict_link[next_state] = failed if self.output[failed] is not None else self.dict_link[failed]
+                queue.append(next_state)
+        self._built = True
+        return self
+
+    def iter_matches(self, text):
+        """逐个产出全部匹配（可重叠）：(起始位置, 结束位置, 值)"""
+        if not self._built:
+            self.build()
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            match = state if self.output[state] is not None else self.dict_link[state]
+            while match != -1:
+                length, value = self.output[match]
+                yield end - length, end, value
+                match = self.dict_link[match]
+
+    def leftmost_longest(self, text):
+        """
+        不重叠的最左最长匹配：从左到右，每个位置取从该位置开始的最长词，
+        匹配后跳到词尾继续
+        :return: [(起始位置, 结束位置, 值), ...]
+        """
+        longest = [None] * len(text)
+        for start, end, value in self.iter_matches(text):
+            if longest[start] is None or end > longest[start][0]:
+                longest[start] = (end, value)
+        matches = []
+        i = 0
+        while i < len(text):
+            if longest[i] is None:
+                i += 1
+                continue
+            end, value = longest[i]
+            matches.append((i, end, value))
+            i = end
+        return matches
@@ -0,0 +1,157 @@
+import mmap
+import struct
+from array import array
+
+# 文件格式：
+#   文件头    MAGIC, 版本, 词条数, 最长词字数
+#   键偏移表  uint32 × (词条数+1)，键按 UTF-8 字节序排序
+#   值偏移表  uint32 × (词条数+1)
+#   键数据    UTF-8 拼接
+#   值数据    UTF-8 拼接，每个值为 "类型\t注释"
+# 偏移表为本机字节序，可直接在 mmap 上按 uint32 读取，不需要解析整个文件
+MAGIC = b'PLEX'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+
+
+def read_tsv(path):
+    """
+    读取 TSV 词库：每行 "词\t类型\t注释"，注释可省略，# 开头的行为注释行
+    :return: [(词, 类型, 注释), ...]
+    """
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            fields = line.split('\t')
+            if len(fields) < 2:
+                raise ValueError(f"{path} 第{line_no}行格式错误：{line}")
+            entries.append((fields[0], fields[1], fields[2] if len(fields) > 2 else ''))
+    return entries
+
+
+def build_lexicon(entries, output_path, priority):
+    """
+    把词条编译成可 mmap 的二进制词库
+    :param entries: [(词, 类型, 注释), ...]
+    :param output_path: 输出文件路径
+    :param priority: 类型列表，按优先级从高到低；同一个词出现多次时保留优先级最高的类型，注释取第一个非空的
+    :return: 词条数
+    """
+    rank = {etype: index for index, etype in enumerate(priority)}
+    merged = {}
+    for word, etype, annotation in entries:
+        if etype not in rank:
+            raise ValueError(f"未知的类型：{etype}（{word}），可选：{priority}")
+        if word not in merged:
+            merged[word] = [etype, annotation]
+            continue
+        current = merged[word]
+        if rank[etype] < rank[current[0]]:
+            current[0] = etype
+        if not current[1]:
+            current[1] = annotation
+
+    keys = sorted((word.encode('utf-8'), word) for word in merged)
+    key_offsets = array('I', [0])
+    value_offsets = array('I', [0])
+    key_blob = bytearray()
+    value_blob = bytearray()
+    for key_bytes, word in keys:
+        etype, annotation = merged[word]
+        key_blob += key_bytes
+        value_blob += f'{etype}\t{annotation}'.encode('utf-8')
+        key_offsets.append(len(key_blob))
+        value_offsets.append(len(value_blob))
+
+    max_length = max((len(word) for word in merged), default=0)
+    with open(output_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), max_length))
+        f.write(key_offsets.tobytes())
+        f.write(value_offsets.tobytes())
+        f.write(key_blob)
+        f.write(value_blob)
+    return len(keys)
+
+
+class CompiledLexicon:
+    """
+    mmap 方式打开的二进制词库：打开时只读文件头，
+    多个进程共享同一份页面缓存，启动耗时与词库大小无关
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.max_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的词库文件：{path}")
+        view = memoryview(self._mm)
+        table_size = (self.count + 1) * 4
+        self._key_offsets = view[HEADER.size:HEADER.size + table_size].cast('I')
+        self._value_offsets = view[HEADER.size + table_size:HEADER.size + 2 * table_size].cast('I')
+        self._keys_start = HEADER.size + 2 * table_size
+        self._values_start = self._keys_start + self._key_offsets[self.count]
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, index):
+        return self._mm[self._keys_start + self._key_offsets[index]:self._keys_start + self._key_offsets[index + 1]]
+
+    def _value(self, index):
+        raw = self._mm[self._values_start + self._value_offsets[index]:self._values_start + self._value_offsets[index + 1]]
+        etype, annotation = raw.decode('utf-8').split('\t', 1)
+        return etype, annotation
+
+    def _lower_bound(self, target, lo, hi):
+        """[lo, hi) 中第一个不小于 target 的键的下标"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, word):
+        """查找词条：(类型, 注释)，不存在时返回 None"""
+        target = word.encode('utf-8')
+        index = self._lower_bound(target, 0, self.count)
+        if index < self.count and self._key(index) == target:
+            return self._value(index)
+        return None
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def leftmost_longest(self, text):
+        """
+        不重叠的最左最长匹配，接口同 AhoCorasick.leftmost_longest
+        每个位置逐字延长前缀，在有序键表中二分缩小以该前缀开头的键区间，区间为空即停止
+        :return: [(起始位置, 结束位置, (类型, 注释)), ...]
+        """
+        matches = []
+        i = 0
+        while i < len(text):
+            lo, hi = 0, self.count
+            best = None
+            j = i
+            while j < len(text) and j - i < self.max_length and lo < hi:
+                j += 1
+                prefix = text[i:j].encode('utf-8')
+                # UTF-8 中不会出现 0xFF，以 prefix 开头的键都落在 [prefix, prefix + 0xFF) 内
+                lo = self._lower_bound(prefix, lo, hi)
+                hi = self._lower_bound(prefix + b'\xff', lo, hi)
+                if lo < hi and self._key(lo) == prefix:
+                    best = (j, lo)
+            if best is None:
+                i += 1
+                continue
+            end, index = best
+            matches.append((i, end, self._value(index)))
+            i = end
+        return matches
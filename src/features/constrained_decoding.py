@@ -0,0 +1,168 @@
+import torch
+from transformers import LogitsProcessor
+from config.poem_config import PoemConfig
+from features.rhyme_checker import RhymeChecker
+
+
+def is_cjk_char(token):
+    """判断词表中的token是否为单个汉字"""
+    return len(token) == 1 and '一' <= token <= '鿿'
+
+
+def build_cjk_mask(tokenizer, vocab_size):
+    """
+    构建词表级的汉字掩码
+    :param tokenizer: BertTokenizer
+    :param vocab_size: 模型输出维度
+    :return: 长度为 vocab_size 的布尔张量，汉字token为True
+    """
+    mask = torch.zeros(vocab_size, dtype=torch.bool)
+    for token, token_id in tokenizer.vocab.items():
+        if token_id < vocab_size and is_cjk_char(token):
+            mask[token_id] = True
+    return mask
+
+
+def build_form_layout(form, tokenizer):
+    """
+    按诗体生成逐位置的解码版式
+    :param form: 诗体名称，见 PoemConfig.POEM_FORMS
+    :param tokenizer: BertTokenizer
+    :return: 列表，汉字位为None，标点位为对应标点的token id
+    """
+    if form not in PoemConfig.POEM_FORMS:
+        raise ValueError(f"不支持的诗体：{form}，可选：{list(PoemConfig.POEM_FORMS)}")
+    spec = PoemConfig.POEM_FORMS[form]
+    punctuation_ids = tokenizer.convert_tokens_to_ids(PoemConfig.LINE_PUNCTUATION)
+    layout = []
+    for line in range(spec['lines']):
+        layout.extend([None] * spec['chars_per_line'])
+        layout.append(punctuation_ids[line % 2])
+    return layout
+
+
+class ToneTable:
+    """词表级平仄/韵母表：用 RhymeChecker 为每个汉字token预先计算一次"""
+
+    def __init__(self, tokenizer, vocab_size):
+        checker = RhymeChecker()
+        self.ping_mask = torch.zeros(vocab_size, dtype=torch.bool)
+        self.ze_mask = torch.zeros(vocab_size, dtype=torch.bool)
+        # 韵母编号，非汉字token为-1
+        self.final_ids = torch.full((vocab_size,), -1, dtype=torch.long)
+        finals = {}
+        for token, token_id in tokenizer.vocab.items():
+            if token_id >= vocab_size or not is_cjk_char(token):
+                continue
+            if checker.get_tone_type(token) == "平声":
+                self.ping_mask[token_id] = True
+            else:
+                self.ze_mask[token_id] = True
+            final = checker.get_final(token)
+            self.final_ids[token_id] = finals.setdefault(final, len(finals))
+
+    def to(self, device):
+        self.ping_mask = self.ping_mask.to(device)
+        self.ze_mask = self.ze_mask.to(device)
+        self.final_ids = self.final_ids.to(device)
+        return self
+
+    def tone_mask(self, tone):
+        """平/仄对应的token掩码"""
+        return self.ping_mask if tone == '平' else self.ze_mask
+
+    def rhyme_mask(self, token_id):
+        """与 token_id 同韵母的token掩码"""
+        return self.final_ids == self.final_ids[token_id]
+
+
+def choose_tone_pattern(seed, tone_table, tokenizer):
+    """
+    为开头文字选择平仄格式：优先选择首字平仄相符的格式
+    :return: PoemConfig.WUYAN_JUJUE_PATTERNS 中的下标
+    """
+    patterns = PoemConfig.WUYAN_JUJUE_PATTERNS
+    first_id = tokenizer.convert_tokens_to_ids(seed[0])
+    for index, pattern in enumerate(patterns):
+        if tone_table.tone_mask(pattern[0])[first_id]:
+            return index
+    return 0
+
+
+class PoemFormLogitsProcessor(LogitsProcessor):
+    """
+    诗体约束解码：
+    - 汉字位只允许汉字token
+    - 标点位强制输出逗号/句号（五言为第5、10、15…位，七言为第7、14、21…位）
+    - 写满整首诗后只输出填充符，解码长度恰好等于诗体长度
+    """
+
+    def __init__(self, layout, prompt_length, filled, cjk_mask, pad_token_id):
+        """
+        :param layout: build_form_layout 的结果
+        :param prompt_length: 输入（含填充）的长度
+        :param filled: 每条序列已由开头文字占据的位置数
+        :param cjk_mask: build_cjk_mask 的结果
+        :param pad_token_id: 填充符 id
+        """
+        self.layout = layout
+        self.prompt_length = prompt_length
+        self.filled = filled
+        self.cjk_mask = cjk_mask
+        self.pad_token_id = pad_token_id
+
+    def position(self, row, cur_len):
+        """当前步第 row 条序列在诗体版式中的位置"""
+        return cur_len - self.prompt_length + self.filled[row]
+
+    def allowed_mask(self, input_ids, row, pos):
+        """汉字位允许的token掩码"""
+        return self.cjk_mask
+
+    def __call__(self, input_ids, scores):
+        cur_len = input_ids.shape[-1]
+        for row in range(scores.shape[0]):
+            pos = self.position(row, cur_len)
+            if pos >= len(self.layout):
+                forced = self.pad_token_id
+            else:
+                forced = self.layout[pos]
+            if forced is None:
+                allowed = self.allowed_mask(input_ids, row, pos)
+                scores[row].masked_fill_(~allowed, -float('inf'))
+            else:
+                scores[row].fill_(-float('inf'))
+                scores[row, forced] = 0
+        return scores
+
+
+class PoemToneLogitsProcessor(PoemFormLogitsProcessor):
+    """
+    平仄押韵约束解码（五言绝句）：
+    - 每个汉字位只允许符合 WUYAN_JUJUE_PATTERNS 对应位置平仄的汉字
+    - 第四句末字只允许与第二句末字同韵母的汉字
+    """
+
+    def __init__(self, layout, patterns, prompt_length, filled, cjk_mask, tone_table, pad_token_id):
+        """
+        :param patterns: 每条序列使用的平仄格式字符串（与 layout 等长）
+        :param tone_table: ToneTable
+        """
+        super().__init__(layout, prompt_length, filled, cjk_mask, pad_token_id)
+        for pattern in patterns:
+            if len(pattern) != len(layout):
+                raise ValueError(f"平仄格式与诗体长度不一致：{pattern}")
+        self.patterns = patterns
+        self.tone_table = tone_table
+        # 偶数句末字为韵脚，以第二句韵脚为准
+        self.rhyme_slots = [i - 1 for i, ch in enumerate(patterns[0]) if ch == '。']
+
+    def allowed_mask(self, input_ids, row, pos):
+        allowed = self.cjk_mask & self.tone_table.tone_mask(self.patterns[row][pos])
+        if pos in self.rhyme_slots[1:]:
+            anchor = self.prompt_length + self.rhyme_slots[0] - self.filled[row]
+            rhymed = allowed & self.tone_table.rhyme_mask(input_ids[row, anchor])
+            # 同韵且合平仄的字不存在时，退回只约束平仄
+            if rhymed.any():
+                allowed = rhymed
+        return allowed
@@ -1,13 +1,13 @@
-import jieba
 from config.poem_config import PoemConfig
+from utils.segmenter import get_segmenter
 
 class ImageWordExtractor:
     def __init__(self):
         self.config = PoemConfig()
         # 加载自定义词典
+        self.segmenter = get_segmenter('jieba', dictionary='image_words')
         for category, words in self.config.IMAGE_WORDS.items():
-            for word in words:
-                jieba.add_word(word)
+            self.segmenter.add_words(words)
     
     def extract_image_words(self, text):
         """
@@ -16,7 +16,7 @@ class ImageWordExtractor:
         :return: 字典，包含各类别的意象词
         """
         # 分词
-        words = jieba.lcut(text)
+        words = self.segmenter.segment(text)
         
         # 初始化结果字典
         result = {category: [] for category in self.config.IMAGE_WORDS.keys()}
@@ -38,7 +38,7 @@ class ImageWordExtractor:
         image_words = self.extract_image_words(text)
         
         statistics = {
-            "total_words": len(jieba.lcut(text)),
+            "total_words": len(self.segmenter.segment(text)),
             "image_words_count": sum(len(words) for words in image_words.values()),
             "categories": {}
         }
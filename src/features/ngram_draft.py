@@ -0,0 +1,104 @@
+import json
+from collections import Counter, defaultdict
+
+
+class NgramDraftModel:
+    """
+    字级n-gram草稿模型：从诗词语料统计“前几个字 -> 最常见的下一个字”，
+    为投机解码快速提出后续若干字，由GPT-2一次前向计算验证
+    """
+
+    def __init__(self, order=4, min_count=2, min_probability=0.3):
+        """
+        :param order: n-gram阶数，上下文最多使用前 order-1 个字
+        :param min_count: 下一个字在该上下文后至少出现的次数
+        :param min_probability: 下一个字在该上下文后的最低占比；
+            不够确定的预测几乎都会被拒绝，验证它们比普通解码一步更慢，因此不提出
+        """
+        self.order = order
+        self.min_count = min_count
+        self.min_probability = min_probability
+        self.table = {}
+
+    @classmethod
+    def from_corpus(cls, paths, order=4, convert=None, **kwargs):
+        """
+        从 poet.song.*.json 格式的语料构建草稿模型
+        :param paths: 语料文件路径列表
+        :param convert: 统计前对全部文本做的转换（如繁体转简体），接收并返回文本列表
+        """
+        texts = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                for poem in json.load(f):
+                    texts.append(''.join(poem.get('paragraphs', [])))
+        if convert is not None:
+            texts = convert(texts)
+        model = cls(order, **kwargs)
+        model.train(texts)
+        return model
+
+    def train(self, texts):
+        """统计每个上下文之后出现次数最多的字，只保留足够确定的预测"""
+        counts = defaultdict(Counter)
+        for text in texts:
+            for i in range(1, len(text)):
+                for n in range(1, self.order):
+                    if i - n < 0:
+                        break
+                    counts[text[i - n:i]][text[i]] += 1
+        self.table = {}
+        for context, counter in counts.items():
+            next_char, count = counter.most_common(1)[0]
+            if count >= self.min_count and count / sum(counter.values()) >= self.min_probability:
+                self.table[context] = next_char
+
+    def predict(self, context):
+        """按最长上下文回退预测下一个字，无法预测时返回None"""
+        for n in range(min(self.order - 1, len(context)), 0, -1):
+            next_char = self.table.get(context[-n:])
+            if next_char is not None:
+                return next_char
+        return None
+
+    def propose(self, context, k):
+        """
+        连续提出最多 k 个草稿字
+        :param context: 已生成的文本
+        :return: 草稿字列表
+        """
+        drafts = []
+        for _ in range(k):
+            next_char = self.predict(context)
+            if next_char is None:
+                break
+            drafts.append(next_char)
+            context += next_char
+        return drafts
+
+    def evaluate(self, texts, k=4):
+        """
+        离线估计草稿质量：在真实文本上逐位置提出草稿，按投机解码的规则接受到第一个不符的字为止
+        :return: {'proposed', 'accepted', 'acceptance_rate', 'chars_per_step'}
+        """
+        proposed = accepted = steps = chars = 0
+        for text in texts:
+            i = 1
+            while i < len(text):
+                drafts = self.propose(text[:i], k)
+                matched = 0
+                for draft, actual in zip(drafts, text[i:]):
+                    if draft != actual:
+                        break
+                    matched += 1
+                proposed += len(drafts)
+                accepted += matched
+                steps += 1
+                chars += min(matched + 1, len(text) - i)
+                i += matched + 1
+        return {
+            'proposed': proposed,
+            'accepted': accepted,
+            'acceptance_rate': accepted / proposed if proposed else 0.0,
+            'chars_per_step': chars / steps if steps else 0.0
+        }
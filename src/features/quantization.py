@@ -0,0 +1,89 @@
+import logging
+import os
+import torch
+import transformers
+from transformers import GPT2Config, GPT2LMHeadModel
+from transformers.modeling_utils import Conv1D
+
+
+def conv1d_to_linear(module):
+    """
+    把 GPT-2 的 Conv1D 层替换为等价的 nn.Linear
+    Conv1D 计算 x @ W + b（W 形状为 输入×输出），nn.Linear 的权重是其转置
+    """
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            linear = torch.nn.Linear(child.weight.shape[0], child.weight.shape[1])
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+    return module
+
+
+def quantize_model(model):
+    """对模型的全部线性层做 int8 动态量化（仅支持CPU推理）"""
+    model = conv1d_to_linear(model)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def build_quantized_skeleton(config):
+    """
+    按模型配置搭建 int8 量化模型的空结构，用于载入缓存的量化权重：
+    先在 meta 设备上构建（不分配内存、不做权重初始化），
+    再把每个 Conv1D/Linear 直接替换为空的动态量化 Linear，最后为其余参数分配未初始化的内存
+    """
+    with torch.device('meta'):
+        model = GPT2LMHeadModel(config)
+    _replace_with_quantized_linear(model)
+    return model.to_empty(device='cpu')
+
+
+def _replace_with_quantized_linear(module):
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            setattr(module, name, torch.nn.quantized.dynamic.Linear(in_features, out_features, dtype=torch.qint8))
+        elif isinstance(child, torch.nn.Linear):
+            setattr(module, name, torch.nn.quantized.dynamic.Linear(
+                child.in_features, child.out_features, bias_=child.bias is not None, dtype=torch.qint8))
+        else:
+            _replace_with_quantized_linear(child)
+
+
+def load_quantized_model(model_name, cache_path):
+    """
+    加载 int8 量化模型：磁盘缓存存在且与当前 torch、transformers 版本一致时直接读取，
+    否则从预训练模型量化后写入缓存
+    缓存中保存模型配置、量化后的 state_dict 和不随 state_dict 保存的缓冲区；
+    读取时用 build_quantized_skeleton 搭建空结构再载入，既不反序列化模块类，也不重新初始化和量化
+    :param model_name: 预训练模型名称
+    :param cache_path: 量化模型缓存文件路径
+    """
+    versions = {'model_name': model_name, 'torch_version': torch.__version__,
+                'transformers_version': transformers.__version__}
+    if os.path.exists(cache_path):
+        cached = torch.load(cache_path, map_location='cpu', weights_only=False)
+        if all(cached.get(key) == value for key, value in versions.items()) and 'state_dict' in cached:
+            logging.info(f'从缓存加载量化模型：{cache_path}')
+            model = build_quantized_skeleton(GPT2Config.from_dict(cached['config']))
+            model.load_state_dict(cached['state_dict'])
+            for name, buffer in cached['buffers'].items():
+                module_name, _, buffer_name = name.rpartition('.')
+                setattr(model.get_submodule(module_name), buffer_name, buffer)
+            model.eval()
+            return model
+        logging.info('量化模型缓存已过期，重新量化')
+
+    logging.info('量化模型（int8 动态量化）...')
+    model = GPT2LMHeadModel.from_pretrained(model_name)
+    model.eval()
+    model = quantize_model(model)
+    state_dict = model.state_dict()
+    # 非持久缓冲区（如注意力的因果掩码）不在 state_dict 中，单独保存
+    buffers = {name: buffer for name, buffer in model.named_buffers() if name not in state_dict}
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    torch.save(dict(versions, config=model.config.to_dict(), state_dict=state_dict, buffers=buffers), cache_path)
+    logging.info(f'量化模型已缓存：{cache_path}')
+    return model
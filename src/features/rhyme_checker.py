@@ -25,6 +25,22 @@ class RhymeChecker:
         else:
             return "入声"
     
+    def get_tone_type(self, char):
+        """
+        获取单个汉字的平仄
+        :param char: 汉字
+        :return: "平声" 或 "仄声"
+        """
+        return "平声" if self.get_tone(char) in self.config.TONE_RULES["平声"] else "仄声"
+    
+    def get_final(self, char):
+        """
+        获取单个汉字的韵母
+        :param char: 汉字
+        :return: 韵母拼音
+        """
+        return pypinyin.lazy_pinyin(char, style=pypinyin.STYLE_FINALS)[0]
+    
     def check_tone(self, text):
         """
         检查文本的平仄
@@ -63,10 +79,9 @@ class RhymeChecker:
                     last_char = char
                     break
             if last_char:
-                pinyin = pypinyin.lazy_pinyin(last_char, style=pypinyin.STYLE_FINALS)[0]
                 rhymes.append({
                     "char": last_char,
-                    "rhyme": pinyin
+                    "rhyme": self.get_final(last_char)
                 })
         
         # 检查是否押韵（第二、四句押韵）
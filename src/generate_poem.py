@@ -53,14 +53,58 @@
    - top_k: 50 (保留概率最高的50个词)
    - top_p: 0.95 (累积概率阈值)
    - no_repeat_ngram_size: 2 (避免重复)
+
+5. 生成会话（PoemGenerator）：
+   - 模型和分词器每个进程只加载一次，由 get_generator() 返回共享实例
+   - 模型常驻 eval 模式，推理在 torch.inference_mode 下进行
+   - 首次调用需要反序列化模型（数秒），之后的调用只有毫秒级的准备开销
+   - generate_poems(n) 把 n 首诗放进同一个批次，一次解码循环完成采样
+
+6. 诗体约束解码（form 参数，如 "五言绝句"、"七言律诗"）：
+   - 通过 LogitsProcessor 逐位置约束：汉字位只允许汉字，句末位强制输出逗号/句号
+   - 写满整首诗即停止，不再生成多余token，也不需要 format_poem 截断或补齐
+
+7. 平仄押韵约束解码（tone_pattern 参数，仅五言绝句）：
+   - 预先用 RhymeChecker 为整个词表计算平仄和韵母，得到词表级掩码
+   - 采样时屏蔽不符合 WUYAN_JUJUE_PATTERNS 对应位置平仄的字，第四句末字限定为第二句的韵
+   - 一次解码即得到合律的诗，不再需要反复生成再校验
+
+8. 多候选重排序（best_of）：
+   - 一个批次采样 n 首候选，批量计算句子嵌入后用 PoemScorer 评分，返回总分最高的 k 首
+   - 分别统计解码、嵌入、评分三个阶段的耗时，便于按延迟预算选择 n
+
+9. 提示前缀缓存（register_prompt）：
+   - 会话启动时为每个主题字（含分词器添加的 [CLS]）预先计算 past_key_values
+   - 生成时从缓存状态开始增量解码，只需对未缓存的部分（如 [SEP]）做前向计算
+   - 任意提示前缀都可以注册，缓存按 LRU 规则淘汰
+
+10. 流式生成（stream）：
+   - 基于同一个增量解码循环，每采样一个字立即产出
+   - 界面可以边生成边显示，首字延迟只有一步前向计算
+
+11. 投机解码（generate_speculative）：
+   - 用 poet.song 语料统计的字级 n-gram 模型作为草稿模型，一次提出若干字
+     （语料为繁体，统计前经 HanLP 转为简体；只保留出现次数和占比足够高的预测，不确定时不提出草稿）
+   - GPT-2 一次前向计算同时验证所有草稿字，按目标分布概率接受，拒绝时从剩余分布重新采样
+   - 接受的草稿字省去逐字解码的前向计算，输出分布与普通采样一致
+
+12. int8 量化推理（GeneratorConfig.quantize）：
+   - 把 GPT-2 的 Conv1D 层换成等价的线性层后做 torch 动态量化，仅用于 CPU
+   - 量化后的模型缓存到磁盘，之后启动直接读取，不再重复量化
 """
 
 import torch
-from transformers import GPT2LMHeadModel, BertTokenizer
+from transformers import (GPT2LMHeadModel, BertTokenizer, LogitsProcessorList,
+                          NoRepeatNGramLogitsProcessor, TemperatureLogitsWarper,
+                          TopKLogitsWarper, TopPLogitsWarper)
 import logging
 import os
+import re
 import sys
 import random
+import threading
+import time
+from collections import OrderedDict
 
 # 添加当前目录到系统路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -68,6 +112,14 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from poem_scorer import PoemScorer
+from config.poem_config import PoemConfig
+from config.generator_config import GeneratorConfig
+from features.quantization import load_quantized_model
+from features.ngram_draft import NgramDraftModel
+from utils.chinese_converter import to_simplified
+from features.constrained_decoding import (PoemFormLogitsProcessor, PoemToneLogitsProcessor,
+                                           ToneTable, build_cjk_mask, build_form_layout,
+                                           choose_tone_pattern, is_cjk_char)
 
 # 配置日志
 logging.basicConfig(
@@ -79,45 +131,453 @@ logging.basicConfig(
     ]
 )
 
-def generate_poem():
-    """生成诗词"""
-    try:
-        # 设置设备
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        logging.info(f'使用设备: {device}')
-        
-        # 加载预训练模型和分词器
+MODEL_NAME = 'uer/gpt2-chinese-poem'
+DRAFT_CORPUS = [os.path.join(os.path.dirname(current_dir), 'poet.song.10000.json')]
+SEED_WORDS = ['春', '夏', '秋', '冬', '月', '风', '花', '雪']
+
+
+class PoemGenerator:
+    """诗词生成会话：持有常驻内存的模型和分词器，可被多次调用"""
+
+    def __init__(self, model_name=MODEL_NAME, device=None, prompt_cache_size=32, quantize=False):
+        # 设置设备（量化模型只能在CPU上运行）
+        if quantize:
+            self.device = torch.device('cpu')
+        else:
+            self.device = device or torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        logging.info(f'使用设备: {self.device}')
+
+        # 加载预训练模型和分词器（每个会话只加载一次）
         logging.info('加载模型和分词器...')
-        model_name = 'uer/gpt2-chinese-poem'
-        tokenizer = BertTokenizer.from_pretrained(model_name)
-        model = GPT2LMHeadModel.from_pretrained(model_name)
-        model.to(device)
-        model.eval()
-        
-        # 设置生成参数
-        input_text = random.choice(['春', '夏', '秋', '冬', '月', '风', '花', '雪'])
-        input_ids = tokenizer.encode(input_text, return_tensors='pt').to(device)
-        
-        # 生成诗词
-        with torch.no_grad():
-            output = model.generate(
+        self.model_name = model_name
+        self.quantize = quantize
+        self.tokenizer = BertTokenizer.from_pretrained(model_name)
+        if quantize:
+            self.model = load_quantized_model(model_name, GeneratorConfig.quantized_model_path)
+        else:
+            self.model = GPT2LMHeadModel.from_pretrained(model_name)
+        self.model.to(self.device)
+        self.model.eval()
+        self._cjk_mask = None
+        self._tone_table = None
+        self._draft_model = None
+        logging.info('模型和分词器加载完成')
+
+        # 生成参数
+        self.generation_kwargs = {
+            'max_length': 50,
+            'no_repeat_ngram_size': 2,
+            'do_sample': True,
+            'top_k': 50,
+            'top_p': 0.95,
+            'temperature': 0.7,
+            'pad_token_id': self.tokenizer.pad_token_id
+        }
+
+        # 提示前缀的 past_key_values 缓存（LRU），预先缓存所有主题字
+        self.prompt_cache_size = prompt_cache_size
+        self._prompt_cache = OrderedDict()
+        self._prompt_cache_lock = threading.Lock()
+        for seed in SEED_WORDS:
+            self.register_prompt(seed)
+
+    @property
+    def cjk_mask(self):
+        """词表级汉字掩码（首次使用时构建）"""
+        if self._cjk_mask is None:
+            self._cjk_mask = build_cjk_mask(self.tokenizer, self.model.config.vocab_size).to(self.device)
+        return self._cjk_mask
+
+    @property
+    def tone_table(self):
+        """词表级平仄/韵母表（首次使用时构建）"""
+        if self._tone_table is None:
+            self._tone_table = ToneTable(self.tokenizer, self.model.config.vocab_size).to(self.device)
+        return self._tone_table
+
+    @property
+    def draft_model(self):
+        """投机解码的 n-gram 草稿模型（首次使用时从语料构建）"""
+        if self._draft_model is None:
+            logging.info('构建 n-gram 草稿模型...')
+            # 语料为繁体，生成模型输出简体，统计前先转为简体
+            self._draft_model = NgramDraftModel.from_corpus(DRAFT_CORPUS, convert=to_simplified)
+        return self._draft_model
+
+    def register_prompt(self, prefix):
+        """
+        预先计算并缓存提示前缀（含 [CLS]）的 past_key_values
+        之后以该前缀开头的提示只需对剩余部分做前向计算
+        :param prefix: 提示前缀，如主题字或 "主题：…" 提示
+        """
+        ids = tuple([self.tokenizer.cls_token_id] + self.tokenizer.encode(prefix, add_special_tokens=False))
+        past, _ = self._forward_prompt(ids)
+        self._cache_put(ids, past)
+
+    def generate(self, seed=None, form=None, tone_pattern=None):
+        """以 seed 为开头生成一首诗词，seed 为空时随机选择主题字"""
+        return self.generate_poems(1, seeds=[seed] if seed else None, form=form,
+                                   tone_pattern=tone_pattern)[0]
+
+    def generate_poems(self, n, seeds=None, form=None, tone_pattern=None):
+        """
+        一次批量生成 n 首诗词
+        :param n: 生成数量
+        :param seeds: 每首诗的开头文字列表（长度为 n），为空时随机选择主题字
+        :param form: 诗体名称（见 PoemConfig.POEM_FORMS），为空时自由采样
+        :param tone_pattern: WUYAN_JUJUE_PATTERNS 的下标，或 'auto' 按首字平仄选择；为空时不约束平仄
+        :return: 格式化后的诗词列表
+        """
+        if seeds is None:
+            seeds = [random.choice(SEED_WORDS) for _ in range(n)]
+        if len(seeds) != n:
+            raise ValueError(f"seeds 数量（{len(seeds)}）与生成数量（{n}）不一致")
+
+        state, processors, max_length = self._prepare(seeds, form, tone_pattern)
+        output = self._decode(state, processors, max_length)
+
+        if form or tone_pattern is not None:
+            # 约束解码：只保留汉字和句末标点，按标点断行
+            prompt_length = state[0].shape[1]
+            poems = []
+            for seed, ids in zip(seeds, output[:, prompt_length:].tolist()):
+                tokens = self.tokenizer.convert_ids_to_tokens(ids)
+                body = ''.join(t for t in tokens if is_cjk_char(t) or t in PoemConfig.LINE_PUNCTUATION)
+                poems.append(format_form_poem(seed + body))
+            return poems
+
+        # 解码并格式化每条输出
+        texts = self.tokenizer.batch_decode(output, skip_special_tokens=True)
+        return [format_poem(text) for text in texts]
+
+    def stream(self, seed=None, form=None, tone_pattern=None):
+        """
+        流式生成：每采样一个字就立即产出，首字只需一步前向计算
+        用法：for ch in generator.stream('春', form='五言绝句'): ...
+        :return: 生成器，依次产出开头文字和之后采样的每个字（约束解码时包括句末标点）
+        """
+        seed = seed or random.choice(SEED_WORDS)
+        state, processors, max_length = self._prepare([seed], form, tone_pattern)
+        for ch in seed:
+            yield ch
+        for _, token in self._decode_steps(state, processors, max_length):
+            text = self.tokenizer.convert_ids_to_tokens(token.item())
+            if text not in self.tokenizer.all_special_tokens:
+                yield text
+
+    def generate_speculative(self, seed=None, form=None, tone_pattern=None, draft_length=4, stats=None):
+        """
+        投机解码生成一首诗词：n-gram 模型提出草稿字，GPT-2 一次前向验证
+        :param draft_length: 每轮最多提出的草稿字数
+        :param stats: 可选的统计字典，累加 proposed/accepted/forward_passes/tokens
+        :return: 格式化后的诗词
+        """
+        seed = seed or random.choice(SEED_WORDS)
+        state, processors, max_length = self._prepare([seed], form, tone_pattern)
+        prompt_length = state[0].shape[1]
+        output = state[0]
+        for output, _ in self._speculative_steps(state, processors, max_length, draft_length, stats):
+            pass
+
+        if form or tone_pattern is not None:
+            tokens = self.tokenizer.convert_ids_to_tokens(output[0, prompt_length:].tolist())
+            body = ''.join(t for t in tokens if is_cjk_char(t) or t in PoemConfig.LINE_PUNCTUATION)
+            return format_form_poem(seed + body)
+        return format_poem(self.tokenizer.decode(output[0], skip_special_tokens=True))
+
+    def best_of(self, n, k, scorer, seeds=None, form='五言绝句', tone_pattern=None):
+        """
+        过量生成后重排序：一次采样 n 首候选，批量评分后返回总分最高的 k 首
+        :param n: 候选数量
+        :param k: 返回数量
+        :param scorer: PoemScorer
+        :return: {'poems': [(诗词, 评分结果), ...], 'timings': {'decode', 'embed', 'score'}}
+        """
+        start = time.perf_counter()
+        candidates = self.generate_poems(n, seeds=seeds, form=form, tone_pattern=tone_pattern)
+        decoded = time.perf_counter()
+        line_embeddings = scorer.embed_poem_lines(candidates)
+        embedded = time.perf_counter()
+        results = [scorer.score_poem(poem, line_embeddings=embeddings)
+                   for poem, embeddings in zip(candidates, line_embeddings)]
+        scored = time.perf_counter()
+
+        ranked = sorted(zip(candidates, results), key=lambda x: x[1]['total_score'], reverse=True)
+        timings = {
+            'decode': decoded - start,
+            'embed': embedded - decoded,
+            'score': scored - embedded
+        }
+        logging.info(f"best_of({n}, {k}) 耗时：解码{timings['decode']:.2f}s，"
+                     f"嵌入{timings['embed']:.2f}s，评分{timings['score']:.2f}s")
+        return {'poems': ranked[:k], 'timings': timings}
+
+    def _encode_batch(self, seeds):
+        """把多个开头文字左侧填充成一个批次"""
+        self.tokenizer.padding_side = 'left'
+        inputs = self.tokenizer(seeds, return_tensors='pt', padding=True)
+        return inputs['input_ids'].to(self.device), inputs['attention_mask'].to(self.device)
+
+    def _logits_warper(self):
+        """与 generation_kwargs 一致的采样变换（温度、top-k、top-p）"""
+        return LogitsProcessorList([
+            TemperatureLogitsWarper(self.generation_kwargs['temperature']),
+            TopKLogitsWarper(self.generation_kwargs['top_k']),
+            TopPLogitsWarper(self.generation_kwargs['top_p'])
+        ])
+
+    def _cache_lookup(self, ids):
+        """查找 ids 在缓存中最长的前缀，命中时按 LRU 规则移到队尾"""
+        with self._prompt_cache_lock:
+            best = None
+            for key in self._prompt_cache:
+                if len(key) <= len(ids) and ids[:len(key)] == key and (best is None or len(key) > len(best)):
+                    best = key
+            if best is None:
+                return None, None
+            self._prompt_cache.move_to_end(best)
+            return best, self._prompt_cache[best]
+
+    def _cache_put(self, ids, past):
+        """写入缓存，超过容量时淘汰最久未使用的前缀"""
+        with self._prompt_cache_lock:
+            self._prompt_cache[ids] = past
+            self._prompt_cache.move_to_end(ids)
+            while len(self._prompt_cache) > self.prompt_cache_size:
+                self._prompt_cache.popitem(last=False)
+
+    def _forward_prompt(self, ids):
+        """
+        计算单条提示的 past_key_values 和最后一个位置的 logits，
+        已缓存的前缀部分直接复用
+        """
+        prefix, past = self._cache_lookup(ids)
+        cached = len(prefix) if prefix else 0
+        if cached == len(ids):
+            # 整条提示都已缓存：回退一个token，以便得到最后位置的 logits
+            cached -= 1
+            past = tuple((k[:, :, :cached], v[:, :, :cached]) for k, v in past)
+        with torch.inference_mode():
+            outputs = self.model(
+                torch.tensor([ids[cached:]], device=self.device),
+                past_key_values=past if cached else None,
+                attention_mask=torch.ones(1, len(ids), dtype=torch.long, device=self.device),
+                position_ids=torch.arange(cached, len(ids), device=self.device).unsqueeze(0),
+                use_cache=True
+            )
+        return outputs.past_key_values, outputs.logits[:, -1, :]
+
+    def _prefill(self, seeds):
+        """
+        计算一批提示的初始解码状态
+        提示等长时（如单字主题）逐条复用缓存后拼接；否则左侧填充后整批前向
+        :return: (input_ids, attention_mask, past_key_values, logits)
+        """
+        encoded = [tuple(self.tokenizer.encode(seed)) for seed in seeds]
+        if len(set(len(ids) for ids in encoded)) == 1:
+            states = {ids: self._forward_prompt(ids) for ids in set(encoded)}
+            rows = [states[ids] for ids in encoded]
+            past = tuple(
+                (torch.cat([row[0][layer][0] for row in rows]), torch.cat([row[0][layer][1] for row in rows]))
+                for layer in range(len(rows[0][0]))
+            )
+            logits = torch.cat([row[1] for row in rows])
+            input_ids = torch.tensor(encoded, device=self.device)
+            attention_mask = torch.ones_like(input_ids)
+            return input_ids, attention_mask, past, logits
+
+        input_ids, attention_mask = self._encode_batch(seeds)
+        with torch.inference_mode():
+            outputs = self.model(
                 input_ids,
-                max_length=50,
-                num_return_sequences=1,
-                no_repeat_ngram_size=2,
-                do_sample=True,
-                top_k=50,
-                top_p=0.95,
-                temperature=0.7,
-                pad_token_id=tokenizer.pad_token_id
+                attention_mask=attention_mask,
+                position_ids=(attention_mask.cumsum(-1) - 1).clamp(min=0),
+                use_cache=True
             )
-        
-        # 解码生成的文本
-        generated_text = tokenizer.decode(output[0], skip_special_tokens=True)
-        
-        # 格式化输出
-        poem = format_poem(generated_text)
-        
+        return input_ids, attention_mask, outputs.past_key_values, outputs.logits[:, -1, :]
+
+    def _decode_steps(self, state, processors, max_length):
+        """
+        增量解码：每步只把上一步采样的token送入模型，复用 past_key_values
+        :param state: _prefill 返回的初始状态
+        :return: 生成器，每步产出 (input_ids, 本步采样的token)
+        """
+        input_ids, attention_mask, past, logits = state
+        warper = self._logits_warper()
+        while input_ids.shape[1] < max_length:
+            with torch.inference_mode():
+                scores = warper(input_ids, processors(input_ids, logits.clone()))
+                next_tokens = torch.multinomial(torch.softmax(scores, dim=-1), num_samples=1)
+                input_ids = torch.cat([input_ids, next_tokens], dim=-1)
+                attention_mask = torch.cat([attention_mask, torch.ones_like(next_tokens)], dim=-1)
+            yield input_ids, next_tokens[:, 0]
+            if input_ids.shape[1] >= max_length:
+                break
+            with torch.inference_mode():
+                outputs = self.model(
+                    next_tokens,
+                    past_key_values=past,
+                    attention_mask=attention_mask,
+                    position_ids=attention_mask.cumsum(-1)[:, -1:] - 1,
+                    use_cache=True
+                )
+            past, logits = outputs.past_key_values, outputs.logits[:, -1, :]
+
+    def _speculative_steps(self, state, processors, max_length, draft_length, stats=None):
+        """
+        投机解码（单条序列）：
+        每轮把上一轮新采样的token和 n-gram 草稿字一起送入模型，一次前向得到每个位置的分布；
+        草稿字 d 以目标分布概率 p(d) 接受，被拒绝时从去掉 d 后的剩余分布重新采样，
+        与逐字采样的输出分布一致
+        :return: 生成器，每产生一个token产出 (input_ids, token)
+        """
+        if stats is None:
+            stats = {}
+        for key in ('proposed', 'accepted', 'forward_passes', 'tokens'):
+            stats.setdefault(key, 0)
+        input_ids, _, past, logits = state
+        warper = self._logits_warper()
+        unk_id = self.tokenizer.unk_token_id
+
+        def target_probs(ids, raw_logits):
+            with torch.inference_mode():
+                return torch.softmax(warper(ids, processors(ids, raw_logits.clone())), dim=-1)
+
+        # 第一个token直接从预填充得到的分布采样，之后 past 始终比 input_ids 少最后一个token
+        token = torch.multinomial(target_probs(input_ids, logits), num_samples=1)
+        input_ids = torch.cat([input_ids, token], dim=-1)
+        stats['tokens'] += 1
+        yield input_ids, token[0, 0]
+
+        while input_ids.shape[1] < max_length:
+            # n-gram 模型提出草稿字，遇到词表外的字即截断
+            context = ''.join(t for t in self.tokenizer.convert_ids_to_tokens(input_ids[0].tolist())
+                              if t not in self.tokenizer.all_special_tokens)
+            drafts = []
+            for ch in self.draft_model.propose(context, min(draft_length, max_length - input_ids.shape[1] - 1)):
+                token_id = self.tokenizer.convert_tokens_to_ids(ch)
+                if token_id == unk_id:
+                    break
+                drafts.append(token_id)
+            stats['proposed'] += len(drafts)
+
+            # 一次前向验证：送入上一轮的新token和全部草稿字
+            length = input_ids.shape[1]
+            feed = torch.tensor([[input_ids[0, -1].item()] + drafts], device=self.device)
+            with torch.inference_mode():
+                outputs = self.model(
+                    feed,
+                    past_key_values=past,
+                    attention_mask=torch.ones(1, length + len(drafts), dtype=torch.long, device=self.device),
+                    position_ids=torch.arange(length - 1, length + len(drafts), device=self.device).unsqueeze(0),
+                    use_cache=True
+                )
+            stats['forward_passes'] += 1
+            step_logits = outputs.logits[0]
+
+            accepted = 0
+            new_token = None
+            for i, draft in enumerate(drafts):
+                probs = target_probs(input_ids, step_logits[i:i + 1])
+                if torch.rand(()).item() < probs[0, draft].item():
+                    accepted += 1
+                    input_ids = torch.cat([input_ids, feed[:, i + 1:i + 2]], dim=-1)
+                    stats['tokens'] += 1
+                    yield input_ids, feed[0, i + 1]
+                    continue
+                # 拒绝：从剩余分布中重新采样
+                residual = probs.clone()
+                residual[0, draft] = 0
+                if residual.sum() > 0:
+                    probs = residual / residual.sum()
+                new_token = torch.multinomial(probs, num_samples=1)
+                break
+            stats['accepted'] += accepted
+
+            if new_token is None and input_ids.shape[1] < max_length:
+                # 草稿全部接受：用最后一个位置的分布再采样一个字
+                new_token = torch.multinomial(target_probs(input_ids, step_logits[len(drafts):len(drafts) + 1]),
+                                              num_samples=1)
+
+            # 只保留已确认token的 past，新采样的token留到下一轮送入
+            keep = length + accepted
+            past = tuple((k[:, :, :keep], v[:, :, :keep]) for k, v in outputs.past_key_values)
+            if new_token is not None:
+                input_ids = torch.cat([input_ids, new_token], dim=-1)
+                stats['tokens'] += 1
+                yield input_ids, new_token[0, 0]
+
+    def _decode(self, state, processors, max_length):
+        """解码到 max_length，返回完整的 token 序列"""
+        output = state[0]
+        for output, _ in self._decode_steps(state, processors, max_length):
+            pass
+        return output
+
+    def _prepare(self, seeds, form=None, tone_pattern=None):
+        """
+        准备解码：计算初始状态，并按生成模式构建 logits 处理器和最大长度
+        :return: (state, processors, max_length)
+        """
+        if tone_pattern is not None:
+            form = form or '五言绝句'
+            if form != '五言绝句':
+                raise ValueError(f"平仄约束只支持五言绝句：{form}")
+        if form:
+            return self._prepare_constrained(seeds, form, tone_pattern)
+
+        state = self._prefill(seeds)
+        processors = LogitsProcessorList([
+            NoRepeatNGramLogitsProcessor(self.generation_kwargs['no_repeat_ngram_size'])
+        ])
+        return state, processors, self.generation_kwargs['max_length']
+
+    def _prepare_constrained(self, seeds, form, tone_pattern=None):
+        """按诗体（及平仄）约束解码：每个token都落在版式上，写满即停"""
+        layout = build_form_layout(form, self.tokenizer)
+        chars_per_line = PoemConfig.POEM_FORMS[form]['chars_per_line']
+        for seed in seeds:
+            if len(seed) >= chars_per_line or not all(is_cjk_char(ch) for ch in seed):
+                raise ValueError(f"开头文字必须是少于{chars_per_line}个的汉字：{seed}")
+
+        state = self._prefill(seeds)
+        prompt_length = state[0].shape[1]
+        filled = [len(seed) for seed in seeds]
+        if tone_pattern is None:
+            constraint = PoemFormLogitsProcessor(layout, prompt_length, filled, self.cjk_mask,
+                                                 self.tokenizer.pad_token_id)
+        else:
+            if tone_pattern == 'auto':
+                indices = [choose_tone_pattern(seed, self.tone_table, self.tokenizer) for seed in seeds]
+            else:
+                indices = [tone_pattern] * len(seeds)
+            patterns = [PoemConfig.WUYAN_JUJUE_PATTERNS[index] for index in indices]
+            constraint = PoemToneLogitsProcessor(layout, patterns, prompt_length, filled, self.cjk_mask,
+                                                 self.tone_table, self.tokenizer.pad_token_id)
+        processors = LogitsProcessorList([
+            NoRepeatNGramLogitsProcessor(self.generation_kwargs['no_repeat_ngram_size']),
+            constraint
+        ])
+        max_length = prompt_length + len(layout) - min(filled)
+        return state, processors, max_length
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+def get_generator():
+    """获取进程内共享的生成会话（首次调用时加载模型）"""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = PoemGenerator(quantize=GeneratorConfig.quantize)
+    return _generator
+
+def generate_poem(form=None, tone_pattern=None):
+    """生成诗词"""
+    try:
+        poem = get_generator().generate(form=form, tone_pattern=tone_pattern)
         logging.info("成功生成新诗词")
         return poem
     except Exception as e:
@@ -125,6 +585,17 @@ def generate_poem():
         logging.error(error_msg)
         raise Exception(error_msg)
 
+def generate_poems(n=5, seeds=None, form=None, tone_pattern=None):
+    """批量生成多首诗词"""
+    try:
+        poems = get_generator().generate_poems(n, seeds=seeds, form=form, tone_pattern=tone_pattern)
+        logging.info(f"成功生成{len(poems)}首新诗词")
+        return poems
+    except Exception as e:
+        error_msg = f"生成诗词失败：{str(e)}"
+        logging.error(error_msg)
+        raise Exception(error_msg)
+
 def format_poem(text):
     """格式化诗词"""
     try:
@@ -152,19 +623,17 @@ def format_poem(text):
         logging.error(error_msg)
         raise Exception(error_msg)
 
+def format_form_poem(text):
+    """格式化约束解码得到的诗词：按句末标点断行，无需截断或补齐"""
+    lines = [line for line in re.split('[，。]', text) if line]
+    return "\n".join(lines)
+
 def main():
     try:
-        # 设置设备
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        logging.info(f'Using device: {device}')
-        
-        # 加载预训练模型和分词器
-        logging.info('Loading model and tokenizer...')
-        model_name = 'uer/gpt2-chinese-poem'
-        tokenizer = BertTokenizer.from_pretrained(model_name)
-        model = GPT2LMHeadModel.from_pretrained(model_name)
-        model.to(device)
-        logging.info('Model and tokenizer loaded successfully')
+        # 加载共享的生成会话
+        logging.info('Loading generator session...')
+        get_generator()
+        logging.info('Generator session loaded successfully')
         
         # 初始化评分器
         logging.info('Initializing poem scorer...')
@@ -173,9 +642,8 @@ def main():
         
         # 生成五首诗歌并评分
         print('\n生成的古诗及其评分:')
-        for i in range(5):
+        for i, poem in enumerate(generate_poems(5)):
             print(f'\n第 {i+1} 首:')
-            poem = generate_poem()
             print(poem)
             
             # 评分
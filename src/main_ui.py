@@ -10,7 +10,7 @@ import random
 import logging
 from test_classifier import classify_poem
 from poem_scorer import PoemScorer
-from generate_poem import generate_poem
+from generate_poem import get_generator, format_form_poem
 from poem_classifier import PoemClassifier
 from emotion_analyzer import EmotionAnalyzer
 
@@ -187,16 +187,23 @@ class PoetryAnalysisUI(QMainWindow):
         """处理生成五首诗词按钮点击事件"""
         try:
             result_text = "生成的五首诗词及评分：\n\n"
+            generator = get_generator()
             for i in range(5):
-                # 生成诗词
-                poem = generate_poem()
+                # 流式生成：每采样一个字就刷新显示
+                result_text += f"第{i+1}首：\n"
+                text = ''
+                for ch in generator.stream(form='五言绝句'):
+                    text += ch
+                    self.generate_output.setText(result_text + text)
+                    QApplication.processEvents()
+                poem = format_form_poem(text)
                 # 评分
                 result = self.poem_scorer.score_poem(poem)
                 total_score = result['total_score']
                 scores = result['scores']
                 analysis = result['analysis']
                 # 添加到结果文本
-                result_text += f"第{i+1}首：\n{poem}\n\n总分：{total_score:.2f}\n"
+                result_text += f"{poem}\n\n总分：{total_score:.2f}\n"
                 for key, value in scores.items():
                     result_text += f"{key}: {value:.2f}\n"
                 result_text += "分析：\n"
@@ -1,24 +1,24 @@
 """
 诗词关键词标亮与注释技术流程图：
-输入诗词 -> 分词处理 -> 关键词识别 -> 分类标注 -> 生成高亮文本
+输入诗词 -> 多模式匹配 -> 分类标注 -> 生成高亮文本
   ↓
-HanLP分词    词典匹配    颜色映射    注释生成
-(分词)    (五类词典)    (五色标注)    (HTML标签)
+自动机匹配    颜色映射    注释生成
+(五类词典)    (五色标注)    (HTML标签)
 
 技术说明：
 1. NLP技术：
-   - 中文分词（HanLP）：
-     * 将诗词文本切分成独立词语
-     * 识别词语边界
-     * 处理诗词特有的语言结构
+   - 多模式匹配（Aho-Corasick 自动机）：
+     * 五类词典编译成一个自动机，直接在原文上扫描，不需要分词
+     * 耗时与诗词长度 + 匹配数成正比，与词典大小无关
+     * "铜雀春深锁二乔"、"商女不知亡国恨"等长典故不受分词边界影响
    - 命名实体识别（NER）：
      * 识别五类实体：意象词、地名、人物、典故、物象
      * 使用预定义词典进行匹配
      * 为每个实体提供详细注释
      * 实现方式：
        - 预定义五类实体词典（意象词、地名、人物、典故、物象）
-       - 对分词结果进行词典匹配
-       - 匹配成功则确定实体类型
+       - 最左最长匹配：从左到右每个位置取最长的词典词，匹配后跳过该词
+       - 同一个词属于多类时按优先级确定类型：典故 > 人物 > 地名 > 意象 > 物象
        - 从注释词典获取详细解释
 
 2. 关键词分类：
@@ -35,12 +35,43 @@ HanLP分词    词典匹配    颜色映射    注释生成
    - 鼠标悬停显示注释内容
 
 4. 使用工具：
-   - HanLP：中文分词和词性标注
+   - Aho-Corasick 自动机（features/aho_corasick.py）：词典匹配
    - HTML：实现高亮和注释显示
+
+5. 实体区间：
+   - annotate_spans 一次扫描得到 (起始, 结束, 类型, 注释) 区间列表，不需要HTML的调用方直接使用
+   - render_html 按区间顺序把片段放入列表，最后一次拼接，耗时与诗词长度成线性关系
+
+6. 编译词库：
+   - 大规模词库（十万条以上）用 src/build_lexicon.py 把 TSV 编译成二进制文件：
+     有序键表 + 偏移数组 + UTF-8 数据
+   - PoemAnnotator(lexicon_path) 以 mmap 方式打开，多个工作进程共享页面缓存，启动耗时与词库大小无关
+   - 匹配时在有序键表上逐字二分缩小前缀区间，结果同样是最左最长匹配
+
+7. 批量注释：
+   - annotate_many(poems, workers=N) 在进程池中匹配，每个工作进程初始化时创建一次注释器
+     （编译词库以 mmap 方式共享），按输入顺序逐首产出区间列表
+   - 命令行对整个语料做注释并输出 JSONL：
+     python src/poem_annotator.py poet.song.10000.json annotations.jsonl --workers 4
 """
 
+import argparse
+import json
+import logging
+import os
 import re
-from pyhanlp import *
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# 添加当前目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from features.aho_corasick import AhoCorasick
+from features.compiled_lexicon import CompiledLexicon
+from config.annotator_config import AnnotatorConfig
 
 # 扩充的注释词典
 ANNOTATION_DICT = {
@@ -180,9 +211,41 @@ ENTITY_TYPE_COLOR = {
     '物象': '#FFD93D',  # 黄色
 }
 
+# 实体类型及其词典，按优先级从高到低排列
+ENTITY_WORDS = {
+    '典故': ALLUSION_WORDS,
+    '人物': PERSON_WORDS,
+    '地名': PLACE_WORDS,
+    '意象': IMAGERY_WORDS,
+    '物象': OBJECT_WORDS,
+}
+
 class PoemAnnotator:
-    def __init__(self):
-        pass
+    def __init__(self, lexicon_path=AnnotatorConfig.lexicon_path):
+        """
+        :param lexicon_path: 编译后的二进制词库路径，为 None 时使用内置词典
+        """
+        self.lexicon_path = lexicon_path
+        if lexicon_path:
+            self.matcher = CompiledLexicon(lexicon_path)
+        else:
+            # 五类词典编译为一个自动机，低优先级先加入，同一个词由高优先级类型覆盖
+            self.matcher = AhoCorasick()
+            for etype, words in reversed(list(ENTITY_WORDS.items())):
+                for word in words:
+                    self.matcher.add(word, (etype, ANNOTATION_DICT.get(word, '')))
+            self.matcher.build()
+
+    def annotate_spans(self, poem):
+        """
+        在原文上做最左最长匹配，返回实体区间：
+        [(起始位置, 结束位置, 类型, 注释), ...]，按出现顺序排列，位置为 poem 中的字符下标（左闭右开）
+        """
+        spans = []
+        for start, end, (etype, annotation) in self.matcher.leftmost_longest(poem):
+            w = poem[start:end]
+            spans.append((start, end, etype, annotation or f'{w}：暂无注释'))
+        return spans
 
     def annotate(self, poem):
         """
@@ -192,43 +255,90 @@ class PoemAnnotator:
             ...
         ]
         """
-        entities = []
-        words = HanLP.segment(poem)
-        for word in words:
-            w = str(word.word)
-            # 分类
-            if w in IMAGERY_WORDS:
-                etype = '意象'
-            elif w in PLACE_WORDS:
-                etype = '地名'
-            elif w in PERSON_WORDS:
-                etype = '人物'
-            elif w in ALLUSION_WORDS:
-                etype = '典故'
-            elif w in OBJECT_WORDS:
-                etype = '物象'
-            else:
-                continue
-            annotation = ANNOTATION_DICT.get(w, f'{w}：暂无注释')
-            entities.append({'text': w, 'type': etype, 'annotation': annotation})
-        return entities
+        return [{'text': poem[start:end], 'type': etype, 'annotation': annotation}
+                for start, end, etype, annotation in self.annotate_spans(poem)]
+
+    def annotate_many(self, poems, workers=1, chunksize=64):
+        """
+        批量注释
+        :param poems: 诗词列表
+        :param workers: 工作进程数，1 表示在当前进程中逐首匹配
+        :param chunksize: 每次分发给工作进程的诗词数量
+        :return: 生成器，按输入顺序逐首产出 annotate_spans 的结果
+        """
+        if workers <= 1:
+            for poem in poems:
+                yield self.annotate_spans(poem)
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.lexicon_path,)) as executor:
+            yield from executor.map(_annotate_worker, poems, chunksize=chunksize)
+
+    def render_html(self, poem, spans):
+        """
+        按实体区间一次性生成高亮HTML和注释列表
+        :param spans: annotate_spans 的结果
+        :return: (高亮后的诗句, 注释列表)
+        """
+        parts = []
+        highlights = []
+        cursor = 0
+        for start, end, etype, annotation in spans:
+            text = poem[start:end]
+            parts.append(poem[cursor:start])
+            # 使用HTML标签进行高亮
+            color = ENTITY_TYPE_COLOR[etype]
+            parts.append(f'<span style="color:{color};font-weight:bold;" title="{annotation}">{text}</span>')
+            highlights.append(f'{text}（{etype}）：{annotation}')
+            cursor = end
+        parts.append(poem[cursor:])
+        return ''.join(parts), highlights
 
     def highlight_and_annotate(self, poem):
         """
         返回高亮后的诗句和注释信息
         """
-        entities = self.annotate(poem)
-        # 按出现顺序高亮
-        highlighted = poem
-        offset = 0
-        highlights = []
-        for ent in entities:
-            idx = highlighted.find(ent['text'], offset)
-            if idx != -1:
-                # 使用HTML标签进行高亮
-                color = ENTITY_TYPE_COLOR[ent['type']]
-                tag = f'<span style="color:{color};font-weight:bold;" title="{ent["annotation"]}">{ent["text"]}</span>'
-                highlighted = highlighted[:idx] + tag + highlighted[idx+len(ent['text']):]
-                offset = idx + len(tag)
-                highlights.append(f'{ent["text"]}（{ent["type"]}）：{ent["annotation"]}')
-        return highlighted, highlights 
\ No newline at end of file
+        return self.render_html(poem, self.annotate_spans(poem))
+
+# 工作进程中的注释器，由 _init_worker 创建
+_worker_annotator = None
+
+def _init_worker(lexicon_path):
+    global _worker_annotator
+    _worker_annotator = PoemAnnotator(lexicon_path)
+
+def _annotate_worker(poem):
+    return _worker_annotator.annotate_spans(poem)
+
+def annotate_corpus(corpus_path, output_path, workers=1, lexicon_path=AnnotatorConfig.lexicon_path):
+    """
+    注释 poet.song.*.json 格式的语料，每首诗输出一行 JSON：
+    {"id", "title", "author", "text", "spans": [[起始, 结束, 类型, 注释], ...]}
+    :return: 注释的诗词数量
+    """
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+    texts = [''.join(poem.get('paragraphs', [])) for poem in corpus]
+
+    annotator = PoemAnnotator(lexicon_path)
+    start = time.perf_counter()
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for poem, text, spans in zip(corpus, texts, annotator.annotate_many(texts, workers)):
+            record = {'id': poem.get('id'), 'title': poem.get('title'), 'author': poem.get('author'),
+                      'text': text, 'spans': spans}
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    logging.info(f"注释完成：{len(texts)}首，耗时{time.perf_counter() - start:.2f}s，输出：{output_path}")
+    return len(texts)
+
+def main():
+    parser = argparse.ArgumentParser(description='诗词语料批量注释')
+    parser.add_argument('corpus', help='poet.song.*.json 格式的语料路径')
+    parser.add_argument('output', help='输出的 JSONL 路径')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='工作进程数')
+    parser.add_argument('--lexicon', default=AnnotatorConfig.lexicon_path, help='编译后的二进制词库路径')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    annotate_corpus(args.corpus, args.output, args.workers, args.lexicon)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+诗词预生成池技术说明：
+
+后台线程 -> 批量生成 -> 批量评分 -> 过滤低分 -> 入池
+                                              ↓
+界面请求 <------------------------------- 从池中取出（O(1)）
+
+1. 池中保存已生成并评分的诗词，界面请求直接从池中取出，无需等待生成
+2. 池中诗词少于低水位时，后台线程按批补充，直到填满
+3. 池为空时（未命中）当场生成，命中/未命中次数可通过 stats() 查看；
+   当场生成的诗词不经过最低总分过滤，直接返回
+4. 一批中没有诗词达到最低总分时，保留得分最高的 fallback_top_k 首入池，
+   并在下一批开始前等待（逐次翻倍），避免评分普遍偏低时后台线程持续占满CPU
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import deque
+
+# 添加当前目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from config.pool_config import PoolConfig
+
+class PoemPool:
+    def __init__(self, generator, scorer, config=None):
+        """
+        :param generator: 生成会话（PoemGenerator）
+        :param scorer: 评分器（PoemScorer）
+        :param config: 池配置，默认使用 PoolConfig
+        """
+        self.generator = generator
+        self.scorer = scorer
+        self.config = config or PoolConfig()
+        
+        self._pool = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """启动后台补充线程"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='PoemPoolWorker', daemon=True)
+            self._thread.start()
+            logging.info("诗词预生成池已启动")
+
+    def stop(self):
+        """停止后台补充线程"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, n=1):
+        """
+        取出 n 首诗词，池中不足的部分当场生成（当场生成的不经过最低总分过滤）
+        :return: [(诗词, 评分结果), ...]
+        """
+        items = []
+        with self._cond:
+            while self._pool and len(items) < n:
+                items.append(self._pool.popleft())
+            self.hits += len(items)
+            self.misses += n - len(items)
+            if len(self._pool) < self.config.low_water_mark:
+                self._cond.notify()
+        
+        if len(items) < n:
+            logging.info(f"预生成池未命中{n - len(items)}首，当场生成")
+            items.extend(self._generate(n - len(items)))
+        return items
+
+    def stats(self):
+        """池状态及命中统计"""
+        with self._cond:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._pool),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def _generate(self, n):
+        """生成并批量评分 n 首诗词"""
+        poems = self.generator.generate_poems(n, form=self.config.form)
+        line_embeddings = self.scorer.embed_poem_lines(poems)
+        return [(poem, self.scorer.score_poem(poem, line_embeddings=embeddings))
+                for poem, embeddings in zip(poems, line_embeddings)]
+
+    def _run(self):
+        """后台线程：低于低水位时按批补充，直到池满"""
+        backoff = 0.0
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._stop.is_set() and len(self._pool) >= self.config.low_water_mark:
+                    self._cond.wait()
+            
+            while not self._stop.is_set() and len(self._pool) < self.config.pool_size:
+                if backoff:
+                    self._stop.wait(backoff)
+                    if self._stop.is_set():
+                        break
+                try:
+                    batch = self._generate(self.config.refill_batch_size)
+                except Exception as e:
+                    logging.error(f"预生成诗词失败：{str(e)}")
+                    self._stop.wait(1)
+                    continue
+                accepted = [item for item in batch if item[1]['total_score'] >= self.config.score_threshold]
+                if accepted:
+                    backoff = 0.0
+                else:
+                    # 没有达标的诗词：保留本批得分最高的几首，下一批前等待
+                    accepted = sorted(batch, key=lambda item: item[1]['total_score'],
+                                      reverse=True)[:self.config.fallback_top_k]
+                    backoff = min(max(backoff * 2, self.config.empty_refill_backoff), self.config.max_refill_backoff)
+                    logging.info(f"本批无诗词达到{self.config.score_threshold}分，保留最高分{len(accepted)}首，"
+                                 f"{backoff:.0f}秒后继续补充")
+                with self._cond:
+                    for item in accepted:
+                        if len(self._pool) < self.config.pool_size:
+                            self._pool.append(item)
+                logging.info(f"预生成池补充{len(accepted)}首，当前{len(self._pool)}首")
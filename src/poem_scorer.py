@@ -19,30 +19,54 @@
      * 计算过程：将每句诗转换为向量，计算相邻句子向量的余弦相似度
      * 评分标准：相似度越高，说明主题越连贯
      * 向量生成：BERT通过预训练学习，将每个字映射到包含语义、语法等特征的高维向量
-     * 相似度计算：使用 cosine_similarity 计算向量间的余弦相似度
+     * 相似度计算：所有句子一次批量编码（按attention mask平均池化），相邻句子的余弦相似度一次向量化算出
    - 韵律评分（20分）：使用 pypinyin 检查押韵
      * 检查方法：获取每行最后一个字的拼音韵母，比较是否相同
      * 评分标准：完全押韵20分，部分押韵5分，不押韵0分
    - 结构评分（15分）：检查字数和结构
-3. 使用 jieba 进行中文分词
+3. 使用 jieba 进行中文分词（经 utils/segmenter.py 的共享分词缓存，同一句只分词一次）
+4. 批量评分：
+   - embed_poem_lines 把多首诗的所有句子放进一个批次做 BERT 前向
+   - score_poem(poem, line_embeddings) 直接使用预先算好的句子嵌入
+   - score_poems 面向整个语料：句子按长度分桶做 BERT 前向以减少填充，
+     押韵所需的拼音和意境/结构评分所需的分词在每组内一次完成，结果逐首流式产出并统计每秒评分数
+5. 嵌入缓存：
+   - 句子嵌入经进程内共享的 EmbeddingCache（utils/embedding_cache.py）缓存，键为 (模型路径, 文本哈希)
+   - 名句在各类任务中反复出现，命中时不再做 BERT 前向；批量接口只对未命中的句子编码
+6. 共享模型：
+   - BertTokenizer/BertModel 从进程内的 ModelRegistry（utils/model_registry.py）获取，
+     与情感分析器共用同一份权重；close() 归还引用
 """
 
-import torch
 from transformers import BertTokenizer, BertModel
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-import jieba
 import re
+import time
 from collections import Counter
+from itertools import islice
 import logging
 from pypinyin import pinyin, Style
+import os
+import sys
+
+# 添加当前目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from utils.embedding_cache import embed_texts, get_embedding_cache
+from utils.model_registry import get_model_registry
+from utils.segmenter import get_segmenter
 
 class PoemScorer:
     def __init__(self):
-        # 加载BERT模型和tokenizer
-        self.tokenizer = BertTokenizer.from_pretrained('models/poem_classifier')
-        self.model = BertModel.from_pretrained('models/poem_classifier')
-        self.model.eval()
+        # 从模型注册表获取共享的BERT模型和tokenizer
+        self.model_path = 'models/poem_classifier'
+        self.model_registry = get_model_registry()
+        self.tokenizer = self.model_registry.acquire(BertTokenizer, self.model_path)
+        self.model = self.model_registry.acquire(BertModel, self.model_path)
+        self.embedding_cache = get_embedding_cache()
+        self.segmenter = get_segmenter('jieba')
         
         # 意象词库
         self.image_words = {
@@ -53,6 +77,11 @@ class PoemScorer:
             '动作': ['飞', '舞', '游', '走', '行', '立', '坐', '卧', '望', '听']
         }
         
+        # 意象词 -> 类别，查找时不必遍历每个类别
+        self.image_word_category = {word: category
+                                    for category, image_list in self.image_words.items()
+                                    for word in image_list}
+        
         # 配置日志
         logging.basicConfig(
             level=logging.INFO,
@@ -63,27 +92,62 @@ class PoemScorer:
             ]
         )
 
+    def close(self):
+        """归还共享的BERT模型和tokenizer"""
+        self.model_registry.release(BertTokenizer, self.model_path)
+        self.model_registry.release(BertModel, self.model_path)
+
     def get_bert_embedding(self, text):
-        """获取文本的BERT嵌入"""
-        inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-        return outputs.last_hidden_state.mean(dim=1).numpy()
-
-    def calculate_image_score(self, poem):
-        """计算意境表达力得分（40分）"""
-        words = list(jieba.cut(poem))
+        """获取文本的BERT嵌入（优先从嵌入缓存读取）"""
+        return self.get_bert_embeddings([text])
+
+    def get_bert_embeddings(self, texts, batch_size=64):
+        """批量获取文本的BERT嵌入（经共享嵌入缓存，见 utils/embedding_cache.py 的 embed_texts）"""
+        return embed_texts(self.tokenizer, self.model, self.model_path, texts, batch_size, self.embedding_cache)
+
+    def embed_poem_lines(self, poems):
+        """
+        一次批量计算多首诗每一句的BERT嵌入
+        :param poems: 诗词列表
+        :return: 与 poems 对应的列表，每项为 (句数, 隐层维度) 的数组
+        """
+        all_lines = [poem.split('\n') for poem in poems]
+        flat = self.get_bert_embeddings([line for lines in all_lines for line in lines])
+        result = []
+        offset = 0
+        for lines in all_lines:
+            result.append(flat[offset:offset + len(lines)])
+            offset += len(lines)
+        return result
+
+    def segment_poems(self, poems):
+        """
+        一次完成一组诗词评分所需的全部分词：整首诗（意境评分）和前两句（结构评分）
+        :return: {文本: 词语元组}，组内重复的文本只分词一次
+        """
+        texts = []
+        for poem in poems:
+            texts.append(poem)
+            texts.extend(poem.split('\n')[:2])
+        return {text: self.segmenter.segment(text) for text in dict.fromkeys(texts)}
+
+    def calculate_image_score(self, poem, segments=None):
+        """
+        计算意境表达力得分（40分）
+        :param segments: segment_poems 预先得到的分词结果
+        """
+        words = segments[poem] if segments is not None else self.segmenter.segment(poem)
         score = 0
         image_count = 0
         has_action = False
         
         # 统计意象词数量
         for word in words:
-            for category, image_list in self.image_words.items():
-                if word in image_list:
-                    image_count += 1
-                    if category == '动作':
-                        has_action = True
+            category = self.image_word_category.get(word)
+            if category is not None:
+                image_count += 1
+                if category == '动作':
+                    has_action = True
         
         # 计算基础分（意象词数量）
         base_score = min(image_count * 2.5, 30)  # 最多30分
@@ -98,23 +162,24 @@ class PoemScorer:
             '动作描写': '有' if has_action else '无'
         }
 
-    def calculate_theme_score(self, poem):
-        """计算主题相关性得分（25分）"""
+    def calculate_theme_score(self, poem, line_embeddings=None):
+        """计算主题相关性得分（25分），line_embeddings 为预先批量计算的句子嵌入"""
         try:
             # 将诗词分成句子
             lines = poem.split('\n')
             if len(lines) < 2:
                 return 0, {'error': '诗词行数不足'}
             
-            # 计算句子间的相似度
-            embeddings = [self.get_bert_embedding(line) for line in lines]
-            similarities = []
-            for i in range(len(embeddings)-1):
-                sim = cosine_similarity(embeddings[i], embeddings[i+1])[0][0]
-                similarities.append(sim)
+            # 所有句子一次批量编码
+            embeddings = line_embeddings if line_embeddings is not None else self.get_bert_embeddings(lines)
+            
+            # 相邻句子的余弦相似度（向量化计算）
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            normed = embeddings / np.maximum(norms, 1e-12)
+            similarities = (normed[:-1] * normed[1:]).sum(axis=1)
             
             # 计算平均相似度
-            avg_sim = np.mean(similarities)
+            avg_sim = float(np.mean(similarities))
             score = avg_sim * 25  # 映射到25分
             
             return score, {'平均相似度': avg_sim}
@@ -122,8 +187,8 @@ class PoemScorer:
             logging.error(f"计算主题相关性得分时出错：{str(e)}")
             return 0, {'error': str(e)}
 
-    def calculate_rhyme_score(self, poem):
-        """计算韵律感得分（20分）"""
+    def calculate_rhyme_score(self, poem, finals=None):
+        """计算韵律感得分（20分），finals 为预先批量查出的 {字: 韵母}"""
         try:
             lines = poem.split('\n')
             if len(lines) < 2:
@@ -131,7 +196,9 @@ class PoemScorer:
             
             # 获取每行最后一个字的拼音韵母
             last_chars = [line[-1] for line in lines if line.strip()]
-            last_pinyins = [pinyin(char, style=Style.FINALS)[0][0] for char in last_chars]
+            if finals is None:
+                finals = self.get_finals(last_chars)
+            last_pinyins = [finals[char] for char in last_chars]
             
             # 检查是否押韵
             if len(set(last_pinyins)) == 1:  # 所有韵母相同
@@ -142,8 +209,11 @@ class PoemScorer:
             logging.error(f"计算韵律感得分时出错：{str(e)}")
             return 0, {'error': str(e)}
 
-    def calculate_structure_score(self, poem):
-        """计算对仗或结构得分（15分）"""
+    def calculate_structure_score(self, poem, segments=None):
+        """
+        计算对仗或结构得分（15分）
+        :param segments: segment_poems 预先得到的分词结果
+        """
         try:
             lines = poem.split('\n')
             if len(lines) < 2:
@@ -160,8 +230,11 @@ class PoemScorer:
             
             # 简单检查对仗（这里只是示例，实际对仗检查更复杂）
             if len(lines) >= 2:
-                line1_words = list(jieba.cut(lines[0]))
-                line2_words = list(jieba.cut(lines[1]))
+                if segments is not None:
+                    line1_words, line2_words = segments[lines[0]], segments[lines[1]]
+                else:
+                    line1_words = self.segmenter.segment(lines[0])
+                    line2_words = self.segmenter.segment(lines[1])
                 if len(line1_words) == len(line2_words):
                     score += 7
                     analysis.append('有对仗倾向')
@@ -171,14 +244,26 @@ class PoemScorer:
             logging.error(f"计算结构得分时出错：{str(e)}")
             return 0, {'error': str(e)}
 
-    def score_poem(self, poem):
-        """综合评分"""
+    def get_finals(self, chars):
+        """一次查出多个字的拼音韵母，返回 {字: 韵母}"""
+        unique = list(dict.fromkeys(chars))
+        if not unique:
+            return {}
+        return {char: item[0] for char, item in zip(unique, pinyin(unique, style=Style.FINALS))}
+
+    def score_poem(self, poem, line_embeddings=None, finals=None, segments=None):
+        """
+        综合评分
+        :param line_embeddings: embed_poem_lines 预先算好的句子嵌入
+        :param finals: get_finals 预先查出的句末字韵母
+        :param segments: segment_poems 预先得到的分词结果
+        """
         try:
             # 计算各项得分
-            image_score, image_analysis = self.calculate_image_score(poem)
-            theme_score, theme_analysis = self.calculate_theme_score(poem)
-            rhyme_score, rhyme_analysis = self.calculate_rhyme_score(poem)
-            structure_score, structure_analysis = self.calculate_structure_score(poem)
+            image_score, image_analysis = self.calculate_image_score(poem, segments)
+            theme_score, theme_analysis = self.calculate_theme_score(poem, line_embeddings)
+            rhyme_score, rhyme_analysis = self.calculate_rhyme_score(poem, finals)
+            structure_score, structure_analysis = self.calculate_structure_score(poem, segments)
             
             # 汇总得分
             scores = {
@@ -212,6 +297,38 @@ class PoemScorer:
                 'analysis': {'error': str(e)}
             }
 
+    def score_poems(self, poems, batch_size=32, stats=None):
+        """
+        批量评分，适合整个语料：
+        - 每 batch_size 首为一组，组内所有句子按长度分桶后做BERT前向
+        - 组内所有句末字的韵母一次查出
+        - 意境和结构评分所需的分词在组内一次完成，重复文本只分词一次
+        - 每组评完立即按输入顺序逐首产出
+        :param poems: 可迭代的诗词（可以是生成器）
+        :param batch_size: 每组诗词数量
+        :param stats: 可选的统计字典，写入 poems、seconds、poems_per_sec
+        :return: 生成器，产出 (诗词, 评分结果)
+        """
+        if stats is None:
+            stats = {}
+        stats.update({'poems': 0, 'seconds': 0.0, 'poems_per_sec': 0.0})
+        start = time.perf_counter()
+        iterator = iter(poems)
+        while True:
+            chunk = list(islice(iterator, batch_size))
+            if not chunk:
+                break
+            line_embeddings = self.embed_poem_lines(chunk)
+            finals = self.get_finals([line[-1] for poem in chunk for line in poem.split('\n') if line.strip()])
+            segments = self.segment_poems(chunk)
+            for poem, embeddings in zip(chunk, line_embeddings):
+                yield poem, self.score_poem(poem, line_embeddings=embeddings, finals=finals, segments=segments)
+            
+            stats['poems'] += len(chunk)
+            stats['seconds'] = time.perf_counter() - start
+            stats['poems_per_sec'] = stats['poems'] / stats['seconds'] if stats['seconds'] else 0.0
+            logging.info(f"已评分{stats['poems']}首，{stats['poems_per_sec']:.1f}首/秒")
+
 def main():
     scorer = PoemScorer()
     
@@ -38,8 +38,8 @@
    - 日志系统：记录翻译过程
 
 3. NLP技术：
-   - 中文分词（HanLP）：
-     * 用于分句处理
+   - 分句：
+     * 按标点符号切分，不需要启动 HanLP
      * 识别词语边界
    - 词典匹配：
      * 意象词匹配：替换古语词为现代词
@@ -49,11 +49,25 @@
      * 简单的语法调整
      * 标点符号处理
      * 词语替换
+
+4. 单遍替换：
+   - 意象词解释和语法调整词合并为一个词表，编译成 Aho-Corasick 自动机（features/aho_corasick.py）
+   - 每句从左到右做一次最左最长匹配，只替换原文，已替换出的译文不会再被替换
+     （"孤舟"译为"孤独的小船"后不会变成"孤独独的小船"）
+   - 耗时与句子长度成正比，词表扩充到数千条也不受影响
 """
 
+import os
 import random
 import logging
-from pyhanlp import *
+import sys
+
+# 添加当前目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from features.aho_corasick import AhoCorasick
 
 # 配置日志
 logging.basicConfig(
@@ -135,6 +149,15 @@ class PoemTranslator:
             '故人': '老朋友'
         }
         
+        # 简单的语法调整
+        self.grammar_dict = {
+            '不': '没有',
+            '无': '没有',
+            '独': '独自',
+            '孤': '孤独'
+        }
+        self.build_glossary()
+        
         # 诗词主题解释
         self.theme_dict = {
             '思乡': '这首诗表达了诗人对故乡的思念之情。',
@@ -195,20 +218,26 @@ class PoemTranslator:
             logging.error(f"翻译诗词时出错：{str(e)}")
             raise
 
-    def _translate_sentence(self, sentence):
-        """基础翻译"""
-        # 替换意象词
+    def build_glossary(self):
+        """把意象词解释和语法调整词编译为一个自动机，修改 imagery_dict/grammar_dict 后需重新调用"""
+        self.glossary = AhoCorasick()
+        for word, meaning in self.grammar_dict.items():
+            self.glossary.add(word, meaning)
+        # 与语法调整词重复时以意象词解释为准
         for word, meaning in self.imagery_dict.items():
-            if word in sentence:
-                sentence = sentence.replace(word, meaning)
-        
-        # 简单的语法调整
-        sentence = sentence.replace('不', '没有')
-        sentence = sentence.replace('无', '没有')
-        sentence = sentence.replace('独', '独自')
-        sentence = sentence.replace('孤', '孤独')
-        
-        return sentence
+            self.glossary.add(word, meaning)
+        self.glossary.build()
+
+    def _translate_sentence(self, sentence):
+        """基础翻译：从左到右一次替换意象词和古语词（最长匹配优先）"""
+        parts = []
+        cursor = 0
+        for start, end, meaning in self.glossary.leftmost_longest(sentence):
+            parts.append(sentence[cursor:start])
+            parts.append(meaning)
+            cursor = end
+        parts.append(sentence[cursor:])
+        return ''.join(parts)
 
     def _identify_theme(self, poem):
         """识别诗词主题"""
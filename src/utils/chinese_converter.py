@@ -0,0 +1,33 @@
+"""
+繁简转换：
+
+1. 训练语料 poet.song.*.json 为繁体，生成模型和主题字为简体，统计前需统一转换为简体
+2. 使用 HanLP 的繁简转换，首次调用时才导入 pyhanlp、启动 JVM
+3. 多段文本拼接后一次转换，只跨越一次 JVM 调用
+"""
+
+import logging
+import threading
+
+_hanlp = None
+_hanlp_lock = threading.Lock()
+
+def _load():
+    global _hanlp
+    if _hanlp is None:
+        with _hanlp_lock:
+            if _hanlp is None:
+                logging.info("正在启动HanLP（繁简转换）...")
+                from pyhanlp import HanLP
+                _hanlp = HanLP
+    return _hanlp
+
+def to_simplified(texts):
+    """
+    把繁体文本转换为简体
+    :param texts: 文本列表（文本中不含换行）
+    :return: 与 texts 对应的简体文本列表
+    """
+    if not texts:
+        return []
+    return str(_load().convertToSimplifiedChinese('\n'.join(texts))).split('\n')
@@ -0,0 +1,262 @@
+"""
+BERT 嵌入缓存：
+
+查找顺序：内存 LRU -> 磁盘存储（可选）-> 调用方计算后写回
+
+1. 键为 (模型路径, 文本哈希)，不同模型的嵌入互不干扰
+2. 内存中按 LRU 规则保留有限条数
+3. 磁盘存储为 float16 数组文件 + 索引文件，以 mmap 方式读取，进程重启后仍然有效；
+   按批追加写入，打开时截掉写入中断留下的半行并重写索引
+4. stats() 返回命中率和内存占用
+5. embed_texts 为评分器、情感分析器共用的批量编码函数：先查缓存，只对未命中的文本做 BERT 前向
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from config.cache_config import CacheConfig
+
+
+def text_key(model_path, text):
+    """缓存键：模型路径和文本的哈希"""
+    return hashlib.sha1(f'{model_path}\0{text}'.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """磁盘上的嵌入存储：float16 数组文件（mmap 读取）+ 键到行号的索引文件"""
+
+    def __init__(self, directory, dim=None):
+        """
+        :param directory: 存储目录
+        :param dim: 向量维度，为 None 时从已有索引文件的首行读取
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, 'embeddings.f16')
+        self.index_path = os.path.join(directory, 'index.tsv')
+        self.index = {}
+        self._mmap = None
+        
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                dim = int(f.readline().rstrip('\n').split('\t')[1])
+                lines = f.read().split('\n')
+            for line in lines:
+                fields = line.split('\t')
+                # 跳过写入中断留下的不完整行
+                if len(fields) == 2 and fields[1].isdigit():
+                    self.index[fields[0]] = int(fields[1])
+        elif dim is not None:
+            lines = []
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                f.write(f'dim\t{dim}\n')
+        else:
+            raise FileNotFoundError(f"嵌入存储不存在：{directory}")
+        self.dim = dim
+        self._rows = self._repair(lines)
+
+    def _repair(self, lines):
+        """
+        修复写入中断留下的不一致：截掉数据文件末尾未写完的行，丢弃指向不存在行的索引，并重写索引文件
+        不修复的话后续追加的向量会错位，旧索引条目也会读到别的文本的向量
+        :param lines: 索引文件中除首行外的原始行
+        :return: 数据文件中完整的行数
+        """
+        row_bytes = self.dim * 2
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        rows = size // row_bytes
+        valid = {key: row for key, row in self.index.items() if row < rows}
+        if size != rows * row_bytes:
+            os.truncate(self.data_path, rows * row_bytes)
+        if len(valid) != len(self.index) or len(valid) != sum(1 for line in lines if line):
+            logging.warning(f"嵌入存储不一致，已修复：保留{len(valid)}条（原索引{len(self.index)}条），数据{rows}行")
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(f'dim\t{self.dim}\n')
+                f.writelines(f'{key}\t{row}\n' for key, row in valid.items())
+            os.replace(tmp_path, self.index_path)
+        self.index = valid
+        return rows
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, key):
+        row = self.index.get(key)
+        if row is None:
+            return None
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            self._mmap = np.memmap(self.data_path, dtype=np.float16, mode='r', shape=(self._rows, self.dim))
+        return np.asarray(self._mmap[row], dtype=np.float32)
+
+    def put(self, key, vector):
+        self.put_many([(key, vector)])
+
+    def put_many(self, items):
+        """
+        批量追加向量，数据文件和索引文件各只打开一次
+        :param items: (键, 向量) 列表，已存在的键跳过
+        """
+        rows = []
+        for key, vector in items:
+            if key not in self.index:
+                self.index[key] = self._rows + len(rows)
+                rows.append((key, np.asarray(vector, dtype=np.float16)))
+        if not rows:
+            return
+        # 先写数据再写索引：中断时最多留下没有索引的数据行，打开时会被截掉或保持无主
+        with open(self.data_path, 'ab') as f:
+            f.write(b''.join(vector.tobytes() for _, vector in rows))
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.writelines(f'{key}\t{self.index[key]}\n' for key, _ in rows)
+        self._rows += len(rows)
+
+
+class EmbeddingCache:
+    """进程内共享的嵌入缓存：有界 LRU，可选磁盘持久化"""
+
+    def __init__(self, max_entries=CacheConfig.embedding_cache_size, persist_dir=CacheConfig.embedding_persist_dir):
+        """
+        :param max_entries: 内存中最多缓存的嵌入条数
+        :param persist_dir: 磁盘持久化目录，为 None 时只使用内存
+        """
+        self.max_entries = max_entries
+        self.persist_dir = persist_dir
+        self._entries = OrderedDict()
+        self._stores = {}
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_path, text):
+        """
+        查找缓存的嵌入
+        :return: 一维 float32 向量，未命中时返回 None
+        """
+        key = text_key(model_path, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            store = self._store_for(model_path)
+            if store is not None:
+                vector = store.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    self.hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def put(self, model_path, text, vector):
+        """写入嵌入（一维向量），开启持久化时同时写入磁盘"""
+        self.put_many(model_path, [text], [vector])
+
+    def put_many(self, model_path, texts, vectors):
+        """批量写入嵌入，开启持久化时一次性追加到磁盘"""
+        # 保存副本：传入的常是批量结果矩阵的一行，保存视图会让整个矩阵常驻内存，调用方修改矩阵也会改到缓存
+        items = [(text_key(model_path, text), np.array(vector, dtype=np.float32, copy=True).reshape(-1))
+                 for text, vector in zip(texts, vectors)]
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            store = self._store_for(model_path, items[0][1].shape[0])
+            if store is not None:
+                store.put_many(items)
+
+    def stats(self):
+        """命中率和内存占用"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'memory_bytes': self.memory_bytes,
+                'persisted': sum(len(store) for store in self._stores.values())
+            }
+
+    def _remember(self, key, vector):
+        """写入内存 LRU，超出容量时淘汰最久未使用的条目"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = vector
+        self.memory_bytes += vector.nbytes
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.memory_bytes -= evicted.nbytes
+
+    def _store_for(self, model_path, dim=None):
+        """
+        每个模型一个磁盘存储目录，首次访问时打开
+        :param dim: 向量维度，仅在需要新建存储时使用
+        :return: EmbeddingStore，未开启持久化或存储尚不存在（dim 为 None）时返回 None
+        """
+        if not self.persist_dir:
+            return None
+        store = self._stores.get(model_path)
+        if store is None:
+            directory = os.path.join(self.persist_dir, hashlib.sha1(model_path.encode('utf-8')).hexdigest()[:12])
+            if dim is None and not os.path.exists(os.path.join(directory, 'index.tsv')):
+                return None
+            store = EmbeddingStore(directory, dim)
+            self._stores[model_path] = store
+            logging.info(f"嵌入持久化存储：{directory}（已有{len(store)}条）")
+        return store
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache():
+    """获取进程内共享的嵌入缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+
+def embed_texts(tokenizer, model, model_path, texts, batch_size=64, cache=None):
+    """
+    批量获取文本的BERT嵌入（按attention mask做平均池化，填充位不参与）
+    已在嵌入缓存中的文本不再参与编码；其余文本按长度排序后分批，长度相近的放在同一批以减少填充
+    :param model_path: 模型路径，作为缓存键的一部分
+    :param cache: 嵌入缓存，为 None 时使用进程内共享的缓存
+    :return: (文本数, 隐层维度) 的 float32 数组，按输入顺序排列
+    """
+    if cache is None:
+        cache = get_embedding_cache()
+    embeddings = np.zeros((len(texts), model.config.hidden_size), dtype=np.float32)
+    missing = []
+    for i, text in enumerate(texts):
+        cached = cache.get(model_path, text)
+        if cached is not None:
+            embeddings[i] = cached
+        else:
+            missing.append(i)
+    order = sorted(missing, key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        inputs = tokenizer([texts[i] for i in indices], return_tensors="pt",
+                           padding=True, truncation=True, max_length=128)
+        with torch.no_grad():
+            outputs = model(**inputs)
+        mask = inputs['attention_mask'].unsqueeze(-1).float()
+        summed = (outputs.last_hidden_state * mask).sum(dim=1)
+        embeddings[indices] = (summed / mask.sum(dim=1).clamp(min=1)).numpy()
+        cache.put_many(model_path, [texts[i] for i in indices], embeddings[indices])
+    return embeddings
@@ -0,0 +1,92 @@
+"""
+进程内模型注册表：
+
+1. 每个 (类, 路径) 只加载一份实例，评分器、情感分析器等共用同一份 BERT 权重
+2. acquire/release 维护引用计数
+3. 引用计数归零后按 idle_timeout 处理：None 常驻内存，0 立即卸载，正数则空闲该秒数后卸载
+"""
+
+import logging
+import threading
+
+from config.cache_config import CacheConfig
+
+
+class ModelRegistry:
+    """按 (类, 路径) 共享 from_pretrained 加载的模型/分词器"""
+
+    def __init__(self, idle_timeout=CacheConfig.model_idle_timeout):
+        """
+        :param idle_timeout: 引用计数归零后卸载前的空闲秒数，None 表示不卸载
+        """
+        self.idle_timeout = idle_timeout
+        self._entries = {}  # (类, 路径) -> {'instance', 'refs', 'timer'}
+        self._lock = threading.Lock()
+
+    def acquire(self, cls, path):
+        """
+        获取共享实例，首次获取时加载
+        :param cls: 带 from_pretrained 的类，如 BertModel、BertTokenizer
+        :param path: 模型路径
+        """
+        key = (cls, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                logging.info(f"加载共享模型：{cls.__name__}({path})")
+                instance = cls.from_pretrained(path)
+                if hasattr(instance, 'eval'):
+                    instance.eval()
+                entry = {'instance': instance, 'refs': 0, 'timer': None}
+                self._entries[key] = entry
+            if entry['timer'] is not None:
+                entry['timer'].cancel()
+                entry['timer'] = None
+            entry['refs'] += 1
+            return entry['instance']
+
+    def release(self, cls, path):
+        """归还共享实例，引用计数归零后按 idle_timeout 卸载"""
+        key = (cls, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['refs'] == 0:
+                return
+            entry['refs'] -= 1
+            if entry['refs'] > 0 or self.idle_timeout is None:
+                return
+            if self.idle_timeout <= 0:
+                self._unload(key)
+            else:
+                entry['timer'] = threading.Timer(self.idle_timeout, self._unload_if_idle, args=(key,))
+                entry['timer'].daemon = True
+                entry['timer'].start()
+
+    def stats(self):
+        """已加载的模型及其引用计数"""
+        with self._lock:
+            return {f"{cls.__name__}({path})": entry['refs'] for (cls, path), entry in self._entries.items()}
+
+    def _unload_if_idle(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['refs'] == 0:
+                self._unload(key)
+
+    def _unload(self, key):
+        """调用方需持有锁"""
+        del self._entries[key]
+        logging.info(f"卸载空闲模型：{key[0].__name__}({key[1]})")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry():
+    """获取进程内共享的模型注册表"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
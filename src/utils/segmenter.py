@@ -0,0 +1,213 @@
+"""
+分词服务：
+
+1. 统一接口 segment(text) -> 词语列表，后端可选：
+   - hanlp：HanLP 分词，首次调用 segment 时才导入 pyhanlp、启动 JVM
+   - jieba：jieba 精确模式分词，首次调用时才加载词典
+   - maxmatch：纯 Python 的词典正向最大匹配，不依赖外部库，启动快，适合多进程批处理
+2. add_words 向后端添加用户词（分析器的意象词、地名等词库），只有 jieba/maxmatch 生效；
+   HanLP 后端忽略用户词：其自定义词典是 JVM 全局的，写入后会改变所有调用方的分词结果
+   （如"孤舟""归雁"变成一个词），HanLP 分词保持原有的基线输出
+3. get_segmenter(backend, dictionary) 返回进程内共享的分词器，默认后端见 SegmenterConfig.backend
+   - 每个 (后端, 用户词典名) 一个实例，各分析器的用户词互不影响：
+     情感分析器向 "emotion" 词典添加"明月"，不会改变评分器（默认词典）的 jieba 分词结果
+   - jieba 的命名词典使用独立的 jieba.Tokenizer；默认词典使用 jieba 的全局分词器
+   - HanLP 不使用用户词，所有词典名共用一个 HanLP 分词器
+4. 分词结果缓存：所有分词器共用一个有界 LRU，键为 (后端, 用户词典名, 用户词版本, 文本)，
+   结果为不可变的元组；同一首诗在各分析器之间每个后端只分词一次，添加用户词后旧结果自然失效
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from config.cache_config import CacheConfig
+from config.segmenter_config import SegmenterConfig
+
+
+class SegmentationCache:
+    """进程内共享的分词结果 LRU 缓存"""
+
+    def __init__(self, max_entries=CacheConfig.segmentation_cache_size):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            words = self._entries.get(key)
+            if words is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return words
+
+    def put(self, key, words):
+        with self._lock:
+            self._entries[key] = words
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """命中率和条目数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries)
+            }
+
+
+segmentation_cache = SegmentationCache()
+
+
+class Segmenter:
+    """分词器基类"""
+
+    name = None
+    # 后端是否使用用户词；为 False 时 add_words 不生效
+    supports_user_words = True
+
+    def __init__(self, dictionary=None):
+        """
+        :param dictionary: 用户词典名，为 None 时为默认词典
+        """
+        self.dictionary = dictionary
+        self.user_words = set()
+        # 用户词版本，每次添加新词后加一
+        self.user_dict_version = 0
+        self._lock = threading.Lock()
+
+    def add_words(self, words):
+        """添加用户词"""
+        if not self.supports_user_words:
+            return
+        with self._lock:
+            new_words = [word for word in words if word and word not in self.user_words]
+            self.user_words.update(new_words)
+            if new_words:
+                self._add_words(new_words)
+                self.user_dict_version += 1
+
+    def segment(self, text):
+        """分词：返回词语元组（优先从分词缓存读取）"""
+        key = (self.name, self.dictionary, self.user_dict_version, text)
+        words = segmentation_cache.get(key)
+        if words is None:
+            words = tuple(self._segment(text))
+            segmentation_cache.put(key, words)
+        return words
+
+    def _segment(self, text):
+        """调用后端分词，返回词语列表"""
+        raise NotImplementedError
+
+    def _add_words(self, words):
+        """把新用户词写入后端，调用方持有锁"""
+
+
+class HanLPSegmenter(Segmenter):
+    """HanLP 分词，JVM 在首次分词时才启动；不写入 JVM 全局的自定义词典"""
+
+    name = 'hanlp'
+    supports_user_words = False
+
+    def __init__(self, dictionary=None):
+        super().__init__(dictionary)
+        self._hanlp = None
+
+    def _segment(self, text):
+        return [str(term.word) for term in self._load().segment(text)]
+
+    def _load(self):
+        if self._hanlp is None:
+            with self._lock:
+                if self._hanlp is None:
+                    logging.info("正在启动HanLP...")
+                    from pyhanlp import HanLP
+                    self._hanlp = HanLP
+        return self._hanlp
+
+
+class JiebaSegmenter(Segmenter):
+    """jieba 精确模式分词：默认词典使用全局分词器，命名词典使用独立的 jieba.Tokenizer"""
+
+    name = 'jieba'
+
+    def __init__(self, dictionary=None):
+        super().__init__(dictionary)
+        self._tokenizer = None
+
+    def _segment(self, text):
+        return self._load().lcut(text)
+
+    def _load(self):
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    import jieba
+                    tokenizer = jieba.dt if self.dictionary is None else jieba.Tokenizer()
+                    for word in self.user_words:
+                        tokenizer.add_word(word)
+                    self._tokenizer = tokenizer
+        return self._tokenizer
+
+    def _add_words(self, words):
+        if self._tokenizer is not None:
+            for word in words:
+                self._tokenizer.add_word(word)
+
+
+class MaxMatchSegmenter(Segmenter):
+    """词典正向最大匹配：从左到右每次取词典中最长的词，匹配不到时切出单字"""
+
+    name = 'maxmatch'
+
+    def __init__(self, dictionary=None, max_word_length=SegmenterConfig.max_word_length):
+        super().__init__(dictionary)
+        self.max_word_length = max_word_length
+
+    def _segment(self, text):
+        words = []
+        i = 0
+        while i < len(text):
+            length = min(self.max_word_length, len(text) - i)
+            while length > 1 and text[i:i + length] not in self.user_words:
+                length -= 1
+            words.append(text[i:i + length])
+            i += length
+        return words
+
+
+SEGMENTERS = {
+    HanLPSegmenter.name: HanLPSegmenter,
+    JiebaSegmenter.name: JiebaSegmenter,
+    MaxMatchSegmenter.name: MaxMatchSegmenter,
+}
+
+_segmenters = {}
+_segmenters_lock = threading.Lock()
+
+def get_segmenter(backend=None, dictionary=None):
+    """
+    获取进程内共享的分词器
+    :param backend: hanlp / jieba / maxmatch，为 None 时使用 SegmenterConfig.backend
+    :param dictionary: 用户词典名，不同名字的分词器各自维护用户词；为 None 时为默认词典
+    """
+    backend = backend or SegmenterConfig.backend
+    if backend not in SEGMENTERS:
+        raise ValueError(f"不支持的分词后端：{backend}，可选：{list(SEGMENTERS)}")
+    if backend == HanLPSegmenter.name:
+        # HanLP 不使用用户词，按词典名分开实例没有意义
+        dictionary = None
+    key = (backend, dictionary)
+    with _segmenters_lock:
+        if key not in _segmenters:
+            _segmenters[key] = SEGMENTERS[backend](dictionary)
+        return _segmenters[key]